@@ -1,8 +1,11 @@
 from models import Parser
 from models import Solver
+from models.reducer import InstanceReducer
 from multiple_validator import validate_all_solutions
 import os
 
+# Search mode, one of Solver.MODES
+MODE = 'ils'
 
 solver = Solver()
 directory = os.listdir('input')
@@ -14,8 +17,8 @@ print("---------- ITERATED LOCAL SEARCH WITH RANDOM RESTARTS ----------")
 for file in directory:
     if file.endswith('.txt'):
         parser = Parser(f'./input/{file}')
-        data = parser.parse()
-        result = solver.iterated_local_search(data, time_limit=300, max_iterations=1000)
+        data = InstanceReducer.reduce(parser.parse())
+        result = solver.solve(data, mode=MODE, time_limit=300, max_iterations=1000)
         score = result.fitness_score
         results.append((file, score))
         print(f"Final score for {file}: {score:,}")
@@ -4,13 +4,14 @@ import os
 
 from models import Parser
 from models import Solver
+from models.reducer import InstanceReducer
 
 INPUT_INSTANCES_DIR = 'input'
 OUTPUT_INSTANCES_DIR = 'output'
 
 MINUTES_TO_RUN = 10
 
-def main(version: str) -> None:
+def main(version: str, mode: str = 'ils', workers: int = None) -> None:
     output_sub_dir = os.path.join(OUTPUT_INSTANCES_DIR, version)
     os.makedirs(output_sub_dir, exist_ok=True)
 
@@ -20,10 +21,12 @@ def main(version: str) -> None:
 
     for instance_path in instance_paths:
         parser = Parser(instance_path)
-        data = parser.parse()
-        result = solver.iterated_local_search(data, 
-                                              time_limit=MINUTES_TO_RUN * 60, 
-                                              max_iterations=1000)
+        data = InstanceReducer.reduce(parser.parse())
+        result = solver.solve(data,
+                              mode=mode,
+                              time_limit=MINUTES_TO_RUN * 60,
+                              max_iterations=1000,
+                              num_workers=workers)
         score = result.fitness_score
         instance_name = os.path.basename(instance_path)
         print(instance_name, score, f'version: {version}')
@@ -34,6 +37,9 @@ def main(version: str) -> None:
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('-v', '--version', type=str, required=True)
+    parser.add_argument('-m', '--mode', choices=Solver.MODES, default='ils')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='processes of the parallel modes (default: one per core)')
 
     args = parser.parse_args()
-    main(args.version)
+    main(args.version, args.mode, args.workers)
@@ -0,0 +1,83 @@
+from models.fitness_cache import FitnessCache
+from models.moves import Move
+from models.rebuild_engine import RebuildEngine
+from models.scanned_books import ScannedBooks
+
+
+class BatchEvaluator:
+    """
+    Scores a block of candidate moves against one base solution.
+
+    Moves are visited in order of their first modified position while a
+    single scanned-book bitmap is rolled forward over the base order, so the
+    state before each move costs one bitmap copy instead of unscanning the
+    base suffix per move. Moves that share a start position (e.g. one signed
+    slot against many unsigned libraries) share the whole prefix. Orders
+    found in the instance's FitnessCache are not simulated.
+    """
+
+    @staticmethod
+    def evaluate(solution, data, moves):
+        """
+        Return the fitness after each move, in the order of `moves`. The
+        solution is left unchanged.
+        """
+        cache = FitnessCache.of(data)
+        fitness = [0] * len(moves)
+        keys = [move.order_key(solution, cache.hasher) for move in moves]
+        starts = [
+            RebuildEngine.resume_index(solution, move.start, RebuildEngine.TWEAK_MARGIN, True)
+            for move in moves
+        ]
+
+        scanned_books = ScannedBooks(size=data.num_books)
+        per_lib = solution.scanned_books_per_library
+        signed = solution.signed_libraries
+        pos = 0
+
+        for i in sorted(range(len(moves)), key=starts.__getitem__):
+            move = moves[i]
+            if type(move).evaluate is not Move.evaluate:
+                # Moves with their own scoring (e.g. crossover) are left to it
+                fitness[i] = move.evaluate(solution, data)
+                continue
+
+            cached = cache.get(keys[i])
+            if cached is not None:
+                fitness[i] = cached
+                continue
+
+            start = starts[i]
+            while pos < start:
+                scanned_books.update(per_lib.get(signed[pos], ()))
+                pos += 1
+
+            curr_time = solution.checkpoint_times[start] if start else 0
+            curr_fitness = solution.checkpoint_scores[start] if start else 0
+            move.apply(solution)
+            try:
+                fitness[i] = RebuildEngine.score_suffix(
+                    solution.signed_libraries, data, start, scanned_books.copy(), curr_time, curr_fitness
+                )
+            finally:
+                move.undo(solution)
+            cache.put(keys[i], fitness[i])
+        return fitness
+
+    @staticmethod
+    def deltas(solution, data, moves):
+        """Return the fitness change of each move relative to `solution`."""
+        base = solution.fitness_score
+        return [fitness - base for fitness in BatchEvaluator.evaluate(solution, data, moves)]
+
+    @staticmethod
+    def best(solution, data, moves):
+        """
+        Return (move, fitness) for the best move of the block, or (None, None)
+        for an empty block. Ties go to the earliest move.
+        """
+        if not moves:
+            return None, None
+        fitness = BatchEvaluator.evaluate(solution, data, moves)
+        best_idx = max(range(len(moves)), key=fitness.__getitem__)
+        return moves[best_idx], fitness[best_idx]
@@ -1,6 +1,5 @@
 class Book:
-    id = 0
-    score = 0
+    __slots__ = ('id', 'score')
 
     def __init__(self, id, score):
         self.id = id    
@@ -0,0 +1,216 @@
+import random
+from bisect import insort
+from collections import deque
+
+from models.deadline import Deadline
+from models.fitness_cache import FitnessCache
+from models.scanned_books import ScannedBooks
+from models.solution import Solution
+
+
+class BookAssignment:
+    """
+    Re-assigns the books of a fixed signed order to maximise the score.
+
+    Once the order is fixed, every signed library has a fixed capacity
+    (its scanning days times books per day), and the sets of books that can
+    be scanned together are the independent sets of a transversal matroid.
+    The greedy rebuild fills libraries one after the other, which can leave
+    a high-scoring book unscanned because the only libraries holding it are
+    full of books another library could have taken.
+
+    optimize() starts from the current assignment, which is optimal for the
+    books it already scans, and inserts the unscanned books best first. For
+    each one, a breadth-first search over alternating paths (library ->
+    one of its books -> another signed library holding it) looks for a
+    library with spare capacity, and otherwise for the lowest book among the
+    libraries it reaches, which is the lowest book of the matroid circuit.
+    The book is added if a library has room, or exchanged for that lowest
+    book if it scores more. Each step keeps the assignment optimal for the
+    books seen so far, so the result is optimal unless a search is cut off
+    at `max_visits` libraries or the deadline expires.
+    """
+    MAX_VISITS = 64
+
+    @staticmethod
+    def optimize(solution, data, deadline=None, max_visits=MAX_VISITS):
+        """
+        Args:
+            solution: The solution whose books are re-assigned; left unchanged
+            data: The problem data
+            deadline: Deadline after which no more books are inserted
+            max_visits: Libraries explored by each alternating-path search
+
+        Returns:
+            A new solution with the same order and a better assignment, or
+            `solution` itself if nothing could be gained
+        """
+        deadline = Deadline.of(deadline)
+        scores = data.scores
+        book_libs = data.book_libs
+        per_lib = solution.scanned_books_per_library
+
+        # Only libraries that scan books advance the clock and take part
+        capacity = {}
+        curr_time = 0
+        for lib_id in solution.signed_libraries:
+            if per_lib.get(lib_id):
+                curr_time += data.lib_signup_days[lib_id]
+                capacity[lib_id] = (data.num_days - curr_time) * data.lib_books_per_day[lib_id]
+        if not capacity:
+            return solution
+
+        books = {lib_id: list(per_lib[lib_id]) for lib_id in capacity}
+        # exits[L][H]: books of L that H also holds, i.e. that L could hand to H
+        exits = {lib_id: {} for lib_id in capacity}
+
+        def link(lib_id, book_id):
+            for other in book_libs[book_id]:
+                if other != lib_id and other in capacity:
+                    exits[lib_id].setdefault(other, set()).add(book_id)
+
+        def unlink(lib_id, book_id):
+            lib_exits = exits[lib_id]
+            for other in book_libs[book_id]:
+                via = lib_exits.get(other)
+                if via is not None:
+                    via.discard(book_id)
+                    if not via:
+                        del lib_exits[other]
+
+        for lib_id, lib_books in books.items():
+            for book_id in lib_books:
+                link(lib_id, book_id)
+
+        scanned_books = solution.scanned_books.copy()
+        scanned_books.reserve(data.num_books)
+        candidates = {
+            book_id for lib_id in capacity
+            for book_id in scanned_books.first_unscanned(data.libs[lib_id].book_ids, len(data.libs[lib_id].book_ids))
+        }
+        candidates = sorted(candidates, key=lambda b: -scores[b])
+
+        spare = {lib_id for lib_id in capacity if len(books[lib_id]) < capacity[lib_id]}
+
+        def lowest_score():
+            full = [scores[books[lib_id][-1]] for lib_id in capacity if lib_id not in spare]
+            return min(full) if full else float('inf')
+
+        floor = lowest_score()
+        gain = 0
+        changed = set()
+        for book_id in candidates:
+            score = scores[book_id]
+            if not spare and score <= floor:
+                # Every scanned book scores at least as much and nothing has room
+                break
+            if deadline.expired():
+                break
+
+            roots = [lib_id for lib_id in book_libs[book_id] if lib_id in capacity]
+            parent = dict.fromkeys(roots)
+            queue = deque(roots)
+            target = None
+            target_score = score
+            while queue:
+                lib_id = queue.popleft()
+                if lib_id in spare:
+                    target, target_score = lib_id, 0
+                    break
+                low = scores[books[lib_id][-1]]
+                if low < target_score:
+                    target, target_score = lib_id, low
+                if len(parent) >= max_visits:
+                    continue
+                for other, via in exits[lib_id].items():
+                    if other not in parent:
+                        parent[other] = (lib_id, next(iter(via)))
+                        queue.append(other)
+            if target is None:
+                continue
+
+            # Free a slot at the end of the path, then shift books towards it
+            if target in spare:
+                if len(books[target]) + 1 >= capacity[target]:
+                    spare.discard(target)
+            else:
+                dropped = books[target].pop()
+                unlink(target, dropped)
+                scanned_books.discard(dropped)
+            lib_id = target
+            while parent[lib_id] is not None:
+                giver, moved = parent[lib_id]
+                books[giver].remove(moved)
+                unlink(giver, moved)
+                insort(books[lib_id], moved, key=lambda b: -scores[b])
+                link(lib_id, moved)
+                changed.add(lib_id)
+                lib_id = giver
+            insort(books[lib_id], book_id, key=lambda b: -scores[b])
+            link(lib_id, book_id)
+            scanned_books.add(book_id)
+            changed.update((lib_id, target))
+            gain += score - target_score
+            floor = lowest_score()
+
+        if not gain:
+            return solution
+
+        new_per_lib = per_lib.copy()
+        for lib_id in changed:
+            new_per_lib[lib_id] = books[lib_id]
+        new_solution = Solution(
+            solution.signed_libraries.copy(),
+            solution.unsigned_libraries.copy(),
+            new_per_lib,
+            scanned_books
+        )
+        new_solution.fitness_score = solution.fitness_score + gain
+        BookAssignment._set_checkpoints(new_solution, solution, data, changed)
+        return new_solution
+
+    @staticmethod
+    def _set_checkpoints(solution, base, data, changed):
+        """
+        Recompute the checkpoints of a re-assigned solution. Order hashes past
+        the first changed library are salted, as in BookChainMove.
+        """
+        num_days = data.num_days
+        per_lib = solution.scanned_books_per_library
+        scores = data.scores
+        hasher = FitnessCache.of(data).hasher
+
+        times = [0]
+        fitness = [0]
+        slack = [num_days]
+        curr_time = 0
+        curr_fitness = 0
+        min_slack = num_days
+        first = None
+        for pos, lib_id in enumerate(solution.signed_libraries):
+            books = per_lib.get(lib_id)
+            if books:
+                signup_end = curr_time + data.lib_signup_days[lib_id]
+                min_slack = min(min_slack, num_days - 1 - signup_end)
+                curr_time = signup_end
+                curr_fitness += sum(map(scores.__getitem__, books))
+            else:
+                min_slack = -1
+            if first is None and lib_id in changed:
+                first = pos
+            times.append(curr_time)
+            fitness.append(curr_fitness)
+            slack.append(min_slack)
+
+        hashes = hasher.prefix_hashes(solution.signed_libraries)
+        salt = random.getrandbits(61)
+        hashes[first + 1:] = [(h + salt) % hasher.MODULUS for h in hashes[first + 1:]]
+
+        solution.checkpoint_times = times
+        solution.checkpoint_scores = fitness
+        solution.checkpoint_slack = slack
+        solution.checkpoint_hash = hashes
+        solution.checkpoint_rule = base.checkpoint_rule
+        solution.reassigned_from = first
+        if base.reassigned_from is not None and base.reassigned_from < first:
+            solution.reassigned_from = base.reassigned_from
@@ -0,0 +1,143 @@
+import heapq
+import random
+import weakref
+from itertools import compress
+from operator import ne
+
+
+class CandidateList:
+    """
+    Unsigned libraries ranked by an optimistic bound on their marginal gain.
+
+    The bound of a library is the score of its books not yet scanned by the
+    current solution, capped by the score of the books it could ship if it
+    were signed up first. Libraries are ranked by that bound per signup
+    day, since the signup time is what a move has to pay for.
+
+    Residual scores and counts of unscanned books are kept per library and
+    updated incrementally: sync() compares the scanned-book bitmap with the
+    one seen last chunk by chunk, and only books whose flag changed touch
+    the libraries holding them (via data.book_libs). The same residuals
+    give the Solver's library efficiencies (see efficiencies()). One list
+    is kept per instance (see of()).
+    """
+    TOP_K = 32
+    CHUNK = 1024
+
+    _instances = weakref.WeakKeyDictionary()
+
+    def __init__(self, data, k=TOP_K):
+        self.data = data
+        self.k = k
+        self.flags = bytearray(data.num_books)
+
+        self.residual = list(data.lib_total_scores)
+        offsets = data.lib_offsets
+        self.book_counts = [offsets[i + 1] - offsets[i] for i in range(data.num_libs)]
+        self.residual_count = list(self.book_counts)
+        self.time_efficiency = [
+            books_per_day / max(1, signup_days)
+            for books_per_day, signup_days in zip(data.lib_books_per_day, data.lib_signup_days)
+        ]
+        self.capacity_score = [
+            data.top_score(lib_id, max(0, data.num_days - data.lib_signup_days[lib_id])
+                           * data.lib_books_per_day[lib_id])
+            for lib_id in range(data.num_libs)
+        ]
+
+        self._solution = None
+        self._key = None
+        self._top = []
+
+    @staticmethod
+    def of(data):
+        """Return the candidate list of an instance, creating it on first use."""
+        candidates = CandidateList._instances.get(data)
+        if candidates is None:
+            candidates = CandidateList(data)
+            CandidateList._instances[data] = candidates
+        return candidates
+
+    def sync(self, scanned_books):
+        """Bring the residual scores in line with `scanned_books`."""
+        flags = scanned_books.flags if hasattr(scanned_books, 'flags') else self._to_flags(scanned_books)
+        ref = self.flags
+        size = len(ref)
+        if len(flags) != size:
+            flags = flags[:size] + bytes(max(0, size - len(flags)))
+
+        scores = self.data.scores
+        book_libs = self.data.book_libs
+        residual = self.residual
+        residual_count = self.residual_count
+        chunk = self.CHUNK
+        for lo in range(0, size, chunk):
+            hi = min(lo + chunk, size)
+            old, new = ref[lo:hi], flags[lo:hi]
+            if old == new:
+                continue
+            for book_id in compress(range(lo, hi), map(ne, old, new)):
+                if flags[book_id]:
+                    delta, count = -scores[book_id], -1
+                else:
+                    delta, count = scores[book_id], 1
+                for lib_id in book_libs[book_id]:
+                    residual[lib_id] += delta
+                    residual_count[lib_id] += count
+            ref[lo:hi] = new
+
+    def _to_flags(self, books):
+        flags = bytearray(len(self.flags))
+        for book_id in books:
+            flags[book_id] = 1
+        return flags
+
+    def bound(self, lib_id):
+        """Optimistic gain of signing up `lib_id` against the synced scanned set."""
+        return min(self.residual[lib_id], self.capacity_score[lib_id])
+
+    def efficiencies(self, lib_ids, scanned_books):
+        """
+        Efficiency of each library of `lib_ids` against `scanned_books`: the
+        score of its unscanned books * 0.6, their share of its books * 0.2
+        and its books per signup day * 0.2, or 0 if it has no unscanned book.
+
+        The saving over scanning each library's books comes only from the
+        incrementally synced residuals; the per-library formula is still
+        evaluated one library at a time (a map() pipeline over the lists
+        measured slower than this comprehension).
+        """
+        self.sync(scanned_books)
+        residual = self.residual
+        residual_count = self.residual_count
+        book_counts = self.book_counts
+        time_efficiency = self.time_efficiency
+        return [
+            residual[lib_id] * 0.6 + residual_count[lib_id] / book_counts[lib_id] * 0.2
+            + time_efficiency[lib_id] * 0.2 if residual_count[lib_id] else 0
+            for lib_id in lib_ids
+        ]
+
+    def priority(self, lib_id):
+        return self.bound(lib_id) / max(1, self.data.lib_signup_days[lib_id])
+
+    def top(self, solution):
+        """
+        Indices into solution.unsigned_libraries of the `k` libraries with
+        the highest priority. The result is kept until another solution asks.
+        """
+        unsigned = solution.unsigned_libraries
+        key = (solution.fitness_score, len(solution.signed_libraries), len(unsigned))
+        cached = self._solution() if self._solution is not None else None
+        if cached is not solution or key != self._key:
+            self.sync(solution.scanned_books)
+            priority = self.priority
+            self._top = heapq.nlargest(self.k, range(len(unsigned)), key=lambda i: priority(unsigned[i]))
+            self._solution = weakref.ref(solution)
+            self._key = key
+        return self._top
+
+    def sample(self, solution):
+        """A random index among the top-k unsigned libraries, or None if there are none."""
+        top = self.top(solution)
+        return random.choice(top) if top else None
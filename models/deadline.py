@@ -0,0 +1,51 @@
+import time
+
+
+class Deadline:
+    """
+    Wall-clock deadline shared by every phase of a run.
+
+    A run creates one Deadline from its time limit and hands it (or a
+    sub-deadline carved out of it) to construction, perturbation and local
+    search, so the total wall-clock time never exceeds the limit no matter
+    how the phases split it.
+    """
+    __slots__ = ('end',)
+
+    def __init__(self, seconds=None, end=None):
+        if end is None:
+            end = float('inf') if seconds is None else time.time() + seconds
+        self.end = end
+
+    def remaining(self):
+        return max(0.0, self.end - time.time())
+
+    def expired(self):
+        return time.time() >= self.end
+
+    def sub(self, fraction=1.0, seconds=None):
+        """
+        Return a deadline ending after `fraction` of the remaining time, capped
+        at `seconds` if given, and never after this deadline.
+        """
+        remaining = self.remaining()
+        budget = remaining * fraction if remaining != float('inf') else float('inf')
+        if seconds is not None:
+            budget = min(budget, seconds)
+        return Deadline(end=min(self.end, time.time() + budget))
+
+    @staticmethod
+    def of(deadline=None, seconds=None):
+        """
+        Return `deadline` (or an unbounded one) further capped at `seconds`
+        from now. Lets functions keep their time_limit arguments while
+        honouring a caller's deadline.
+        """
+        if deadline is None:
+            return Deadline(seconds)
+        if seconds is None:
+            return deadline
+        return deadline.sub(seconds=seconds)
+
+    def __repr__(self):
+        return f"Deadline(remaining={self.remaining():.2f}s)"
@@ -0,0 +1,115 @@
+import random
+import weakref
+from collections import OrderedDict
+
+
+class OrderHash:
+    """
+    Position-keyed hash of a library order.
+
+    The hash of (l_0, ..., l_{n-1}) is sum(key[l_k] * BASE^k) modulo the
+    Mersenne prime 2^61 - 1, with a random key per library. Prefix hashes
+    are kept with the other per-position checkpoints of a solution, which
+    makes the hash of any swapped, replaced, inserted or split order an
+    O(1) update of the base hash.
+    """
+    MODULUS = (1 << 61) - 1
+    BASE = 0x5bd1e9955bd1e995 % MODULUS
+
+    def __init__(self, num_libs, seed=0x5eed):
+        rng = random.Random(seed)
+        self.keys = [rng.randrange(1, self.MODULUS) for _ in range(num_libs)]
+        self.powers = [1]
+        self.inverse_base = pow(self.BASE, -1, self.MODULUS)
+
+    def power(self, k):
+        """BASE^k modulo MODULUS."""
+        powers = self.powers
+        while len(powers) <= k:
+            powers.append(powers[-1] * self.BASE % self.MODULUS)
+        return powers[k]
+
+    def term(self, lib_id, position):
+        return self.keys[lib_id] * self.power(position) % self.MODULUS
+
+    def extend(self, prefix_hash, lib_id, position):
+        """Hash of an order after appending lib_id at `position`."""
+        return (prefix_hash + self.keys[lib_id] * self.power(position)) % self.MODULUS
+
+    def prefix_hashes(self, order):
+        hashes = [0]
+        for position, lib_id in enumerate(order):
+            hashes.append(self.extend(hashes[-1], lib_id, position))
+        return hashes
+
+    def shift(self, order_hash, offset):
+        """Hash of an order after moving every library `offset` positions (may be negative)."""
+        factor = self.power(offset) if offset >= 0 else pow(self.inverse_base, -offset, self.MODULUS)
+        return order_hash * factor % self.MODULUS
+
+
+class FitnessCache:
+    """
+    Bounded LRU map from a signed library order to its fitness.
+
+    Keys are (order hash, order length) as built by OrderHash; values are
+    fitness scores under the tweak rebuild rule, so the cache is only used
+    for move evaluation. One cache is kept per instance (see of()). The
+    hits/misses counters help size `capacity` per instance.
+    """
+    DEFAULT_CAPACITY = 100_000
+
+    _instances = weakref.WeakKeyDictionary()
+
+    def __init__(self, num_libs, capacity=DEFAULT_CAPACITY):
+        self.hasher = OrderHash(num_libs)
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def of(data):
+        """Return the cache of an instance, creating it on first use."""
+        cache = FitnessCache._instances.get(data)
+        if cache is None:
+            cache = FitnessCache(len(data.libs))
+            FitnessCache._instances[data] = cache
+        return cache
+
+    def get(self, key):
+        if key is None:
+            return None
+        fitness = self.entries.get(key)
+        if fitness is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return fitness
+
+    def put(self, key, fitness):
+        if key is None or self.capacity <= 0:
+            return
+        self.entries[key] = fitness
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def resize(self, capacity):
+        self.capacity = capacity
+        while len(self.entries) > max(capacity, 0):
+            self.entries.popitem(last=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate(),
+            'size': len(self.entries),
+            'capacity': self.capacity,
+        }
@@ -1,24 +1,37 @@
+import os
 import random
-import time
 import heapq
+import multiprocessing
 from models.solution import Solution
 from models.library import Library
+from models.scanned_books import ScannedBooks
 from models.local_search import LocalSearch
+from models.deadline import Deadline
 
 
 class InitialSolution:
+    # Share of the construction time left when each phase starts; the sorted
+    # builder always runs last so that a solution exists even when time is up
+    PHASE_SHARES = {
+        'weighted': 0.6,
+        'greedy': 0.5,
+        'grasp': 1.0,
+    }
+    # Seconds the parallel portfolio waits past its deadline for constructors
+    # to hand back their partial solutions before the pool is terminated
+    GRACE_SECONDS = 1.0
 
     @staticmethod
-    def generate_initial_solution_grasp(data, p=0.05, max_time=60):
-        start_time = time.time()
+    def generate_initial_solution_grasp(data, p=0.05, max_time=60, deadline=None):
+        deadline = Deadline.of(deadline, max_time)
         best_solution = None
         Library._id_counter = 0
 
-        while time.time() - start_time < max_time:
+        while best_solution is None or not deadline.expired():
             candidate_solution = InitialSolution.build_grasp_solution(data, p)
 
             improved_solution = LocalSearch.local_search(
-                candidate_solution, data, time_limit=5, max_iterations=100
+                candidate_solution, data, time_limit=5, max_iterations=100, deadline=deadline
             )
 
             if (best_solution is None) or (
@@ -32,13 +45,13 @@ class InitialSolution:
     def build_grasp_solution(data, p=0.05):
         libs_sorted = sorted(
             data.libs,
-            key=lambda l: (l.signup_days, -sum(data.scores[b.id] for b in l.books)),
+            key=lambda l: (l.signup_days, -data.lib_total_scores[l.id]),
         )
 
         signed_libraries = []
         unsigned_libraries = []
         scanned_books_per_library = {}
-        scanned_books = set()
+        scanned_books = ScannedBooks(size=data.num_books)
         curr_time = 0
 
         candidate_libs = libs_sorted[:]
@@ -56,10 +69,7 @@ class InitialSolution:
                 time_left = data.num_days - (curr_time + chosen_lib.signup_days)
                 max_books_scanned = time_left * chosen_lib.books_per_day
 
-                available_books = sorted(
-                    {book.id for book in chosen_lib.books} - scanned_books,
-                    key=lambda b: -data.scores[b],
-                )[:max_books_scanned]
+                available_books = scanned_books.first_unscanned(chosen_lib.book_ids, max_books_scanned)
 
                 if available_books:
                     signed_libraries.append(chosen_lib.id)
@@ -83,13 +93,13 @@ class InitialSolution:
         Library._id_counter = 0
         sorted_libraries = sorted(
             data.libs,
-            key=lambda l: (l.signup_days, -sum(data.scores[b.id] for b in l.books)),
+            key=lambda l: (l.signup_days, -data.lib_total_scores[l.id]),
         )
 
         signed_libraries = []
         unsigned_libraries = []
         scanned_books_per_library = {}
-        scanned_books = set()
+        scanned_books = ScannedBooks(size=data.num_books)
         curr_time = 0
 
         for library in sorted_libraries:
@@ -100,10 +110,7 @@ class InitialSolution:
             time_left = data.num_days - (curr_time + library.signup_days)
             max_books_scanned = time_left * library.books_per_day
 
-            available_books = sorted(
-                {book.id for book in library.books} - scanned_books,
-                key=lambda b: -data.scores[b],
-            )[:max_books_scanned]
+            available_books = scanned_books.first_unscanned(library.book_ids, max_books_scanned)
 
             if available_books:
                 signed_libraries.append(library.id)
@@ -128,8 +135,8 @@ class InitialSolution:
         Library._id_counter = 0
         lib_info = []
         for lib in data.libs:
-            sorted_books = sorted(lib.books, key=lambda b: -data.scores[b.id])
-            total_score = sum(data.scores[b.id] for b in sorted_books)
+            sorted_books = lib.book_ids
+            total_score = data.lib_total_scores[lib.id]
             lib_info.append(
                 {"lib": lib, "sorted_books": sorted_books, "total_score": total_score}
             )
@@ -139,14 +146,14 @@ class InitialSolution:
             lib = info["lib"]
             if lib.signup_days < data.num_days:
                 max_books = (data.num_days - lib.signup_days) * lib.books_per_day
-                score = sum(data.scores[b.id] for b in info["sorted_books"][:max_books])
+                score = data.top_score(lib.id, max_books)
                 efficiency = (
                     score / lib.signup_days if lib.signup_days > 0 else float("inf")
                 )
                 heapq.heappush(heap, (-efficiency, idx))
 
         signed = []
-        scanned_books = set()
+        scanned_books = ScannedBooks(size=data.num_books)
         scanned_per_lib = {}
         curr_time = 0
         used_libs = set()
@@ -161,9 +168,7 @@ class InitialSolution:
                 continue
             time_left = data.num_days - (curr_time + lib.signup_days)
             max_books = time_left * lib.books_per_day
-            available_books = [
-                b.id for b in info["sorted_books"] if b.id not in scanned_books
-            ][:max_books]
+            available_books = scanned_books.first_unscanned(info["sorted_books"], max_books)
             if not available_books:
                 continue
             signed.append(lib.id)
@@ -172,55 +177,112 @@ class InitialSolution:
             curr_time += lib.signup_days
             used_libs.add(idx)
 
-        sol = Solution(signed, [], scanned_per_lib, scanned_books)
+        unsigned = [lib.id for idx, lib in enumerate(data.libs) if idx not in used_libs]
+        sol = Solution(signed, unsigned, scanned_per_lib, scanned_books)
         sol.calculate_fitness_score(data.scores)
         return sol
 
     @staticmethod
-    def generate_initial_solution_weighted_efficiency(data, alpha=1, beta=0.1):
+    def generate_initial_solution_weighted_efficiency(data, alpha=1, beta=0.1, deadline=None):
+        """
+        Repeatedly sign the library with the best score / (signup^alpha * (1 + beta * used)).
+
+        Lazy greedy (CELF): scores only drop as books get scanned and days
+        pass, so libraries wait in max-heaps keyed by possibly stale scores
+        and are re-evaluated only when they reach the top. A top entry is
+        still exact when none of its books were scanned since and its day
+        budget still covers its books. Libraries are grouped by signup days:
+        within a group the penalty is shared, so the best ratio is the best
+        score (ties on the lowest id). The group tops sit in a second lazy
+        heap ordered by (-ratio, id), so ties go to the lowest id as in a
+        full scan.
+        Stops adding libraries once the deadline passes; the partial
+        schedule built so far is still feasible.
+        """
+        deadline = Deadline.of(deadline)
         Library._id_counter = 0
-        libs = data.libs[:]
         curr_time = 0
-        scanned_books = set()
+        scanned_books = ScannedBooks(size=data.num_books)
         scanned_per_lib = {}
         signed_libs = []
-        unsigned_libs = []
-
         used = 0
-        while libs and curr_time < data.num_days:
-            lib_scores = []
-            for lib in libs:
-                if curr_time + lib.signup_days >= data.num_days:
-                    continue
-                time_left = data.num_days - (curr_time + lib.signup_days)
-                max_books = time_left * lib.books_per_day
-                books = sorted(
-                    [b.id for b in lib.books if b.id not in scanned_books],
-                    key=lambda x: -data.scores[x],
-                )[:max_books]
-                score = sum(data.scores[b] for b in books)
-                if score:
-                    penalty = (lib.signup_days**alpha) * (1 + beta * used)
-                    lib_scores.append((score / penalty, lib, books))
-
-            if not lib_scores:
-                break
-
-            _, best_lib, best_books = max(lib_scores, key=lambda x: x[0])
-            libs.remove(best_lib)
-            signed_libs.append(best_lib.id)
-            scanned_per_lib[best_lib.id] = best_books
-            scanned_books.update(best_books)
-            curr_time += best_lib.signup_days
+        dirty = bytearray(len(data.libs))
+
+        def evaluate(lib):
+            # Libraries that no longer fit, or add nothing, never will again
+            if curr_time + lib.signup_days >= data.num_days:
+                return None
+            time_left = data.num_days - (curr_time + lib.signup_days)
+            max_books = time_left * lib.books_per_day
+            books = scanned_books.first_unscanned(lib.book_ids, max_books)
+            score = data.selection_score(lib.id, books)
+            dirty[lib.id] = 0
+            return (-score, lib.id, books) if score else None
+
+        def valid_top(heap):
+            while heap:
+                _, lib_id, books = heap[0]
+                lib = data.libs[lib_id]
+                max_books = (data.num_days - (curr_time + lib.signup_days)) * lib.books_per_day
+                if not dirty[lib_id] and max_books >= len(books):
+                    return heap[0]
+                entry = evaluate(lib)
+                if entry is None:
+                    heapq.heappop(heap)
+                else:
+                    heapq.heapreplace(heap, entry)
+            return None
+
+        def group_entry(signup_days, heap):
+            top = valid_top(heap)
+            if top is None:
+                return None
+            penalty = (signup_days**alpha) * (1 + beta * used)
+            return (-(-top[0] / penalty), top[1], used, signup_days)
+
+        groups = {}
+        for lib in data.libs:
+            entry = evaluate(lib)
+            if entry is not None:
+                groups.setdefault(lib.signup_days, []).append(entry)
+        for heap in groups.values():
+            heapq.heapify(heap)
+
+        # The group tops are themselves kept lazily, keyed by their ratio at
+        # the step they were last evaluated in
+        tops = [entry for entry in (group_entry(k, h) for k, h in groups.items()) if entry is not None]
+        heapq.heapify(tops)
+
+        while tops and curr_time < data.num_days and not deadline.expired():
+            neg_ratio, lib_id, evaluated_at, signup_days = heapq.heappop(tops)
+            heap = groups[signup_days]
+            if evaluated_at != used:
+                entry = group_entry(signup_days, heap)
+                if entry is not None:
+                    heapq.heappush(tops, entry)
+                continue
+
+            _, lib_id, books = heapq.heappop(heap)
+            lib = data.libs[lib_id]
+            signed_libs.append(lib_id)
+            scanned_per_lib[lib_id] = books
+            scanned_books.update(books)
+            for book_id in books:
+                for other in data.book_libs[book_id]:
+                    dirty[other] = 1
+            curr_time += lib.signup_days
             used += 1
+            if heap:
+                heapq.heappush(tops, (neg_ratio, lib_id, -1, signup_days))
 
+        unsigned_libs = [lib.id for lib in data.libs if lib.id not in scanned_per_lib]
         sol = Solution(signed_libs, unsigned_libs, scanned_per_lib, scanned_books)
         sol.calculate_fitness_score(data.scores)
         return sol
 
     @staticmethod
-    def tune_weighted_efficiency_parameters(data, time_limit=60):
-        start_time = time.time()
+    def tune_weighted_efficiency_parameters(data, time_limit=60, deadline=None):
+        deadline = Deadline.of(deadline, time_limit)
         best_score = 0
         best_alpha = 1.0
         best_beta = 0.1
@@ -231,12 +293,12 @@ class InitialSolution:
 
         for alpha in alpha_values:
             for beta in beta_values:
-                if time.time() - start_time >= time_limit:
+                if deadline.expired():
                     return best_alpha, best_beta, best_score, best_solution
 
                 solution = (
                     InitialSolution.generate_initial_solution_weighted_efficiency(
-                        data, alpha=alpha, beta=beta
+                        data, alpha=alpha, beta=beta, deadline=deadline
                     )
                 )
                 score = solution.fitness_score
@@ -250,103 +312,77 @@ class InitialSolution:
         return best_alpha, best_beta, best_score, best_solution
 
     @staticmethod
-    def generate_initial_greedy_heap(data):
-        book_scores = data.scores
-        
-        lib_info = []
-        for lib_id, lib in enumerate(data.libs):
-            sorted_books = sorted(lib.books, key=lambda b: -book_scores[b.id])
-            total_score = sum(book_scores[b.id] for b in sorted_books)
-            
-            if lib.signup_days < data.num_days:
-                max_scannable = (data.num_days - lib.signup_days) * lib.books_per_day
-                potential_score = sum(book_scores[b.id] for b in sorted_books[:min(max_scannable, len(sorted_books))])
-                efficiency = potential_score / lib.signup_days if lib.signup_days > 0 else float('inf')
-            else:
-                efficiency = 0
-                
-            lib_info.append({
-                'id': lib_id,
-                'lib': lib,
-                'sorted_books': sorted_books,
-                'total_score': total_score,
-                'efficiency': efficiency
-            })
-        
-        heap = []
-        for info in lib_info:
-            if info['efficiency'] > 0:
-                heapq.heappush(heap, (-info['efficiency'], info['id']))
-        
-        scanned_books = set()
+    def generate_initial_greedy_heap(data, deadline=None):
+        """
+        Repeatedly sign the library with the highest efficiency: the score of
+        the books it could still scan, divided by its signup days.
+
+        Efficiencies only drop as books are scanned and days pass, so the
+        heap holds possibly stale keys. Each entry carries the library's
+        version, bumped whenever one of its books is scanned; a popped entry
+        whose version is current and whose book count still fits the day
+        budget is exact and gets signed. Otherwise it is re-scored and pushed
+        back. Re-scoring starts from a per-library cursor past the library's
+        leading scanned books.
+        """
+        deadline = Deadline.of(deadline)
+        flags = None
         current_day = 0
+        version = [0] * len(data.libs)
+        cursor = [0] * len(data.libs)
+
+        def score(lib_id):
+            lib = data.libs[lib_id]
+            if current_day + lib.signup_days >= data.num_days:
+                return None
+            days_left = data.num_days - (current_day + lib.signup_days)
+            max_scannable = min(days_left * lib.books_per_day, len(lib.book_ids))
+
+            sorted_books = lib.book_ids
+            c = cursor[lib_id]
+            while c < len(sorted_books) and flags[sorted_books[c]]:
+                c += 1
+            cursor[lib_id] = c
+
+            books = scanned_books.first_unscanned(sorted_books[c:], max_scannable)
+            potential = data.selection_score(lib_id, books, c)
+            efficiency = potential / lib.signup_days if lib.signup_days > 0 else float('inf')
+            if efficiency <= 0:
+                return None
+            return (-efficiency, lib_id, version[lib_id], books)
+
+        scanned_books = ScannedBooks(size=data.num_books)
+        flags = scanned_books.flags
+        heap = [entry for entry in map(score, range(len(data.libs))) if entry is not None]
+        heapq.heapify(heap)
+
         used_libs = set()
-        
         signed_libs = []
         unsigned_libs = []
         scanned_books_per_library = {}
-        
-        while heap and current_day < data.num_days:
-            _, lib_id = heapq.heappop(heap)
-            
-            if lib_id in used_libs:
-                continue
-                
+
+        while heap and current_day < data.num_days and not deadline.expired():
+            _, lib_id, stamp, books_to_scan = heapq.heappop(heap)
             lib = data.libs[lib_id]
-            info = lib_info[lib_id]
-            
-            if current_day + lib.signup_days >= data.num_days:
-                unsigned_libs.append(lib_id)
-                continue
-                
+
             days_left = data.num_days - (current_day + lib.signup_days)
-            max_scannable = min(days_left * lib.books_per_day, len(lib.books))
-            
-            available_books = [b.id for b in info['sorted_books'] if b.id not in scanned_books]
-            
-            if not available_books:
-                unsigned_libs.append(lib_id)
+            max_scannable = min(days_left * lib.books_per_day, len(lib.book_ids))
+            if stamp != version[lib_id] or max_scannable < len(books_to_scan):
+                entry = score(lib_id)
+                if entry is not None:
+                    heapq.heappush(heap, entry)
                 continue
-                
-            books_to_scan = available_books[:max_scannable]
-            
-            if not books_to_scan:
-                unsigned_libs.append(lib_id)
-                continue
-                
+
             signed_libs.append(lib_id)
             scanned_books_per_library[lib_id] = books_to_scan
-            
             scanned_books.update(books_to_scan)
-            
+            for book_id in books_to_scan:
+                for other in data.book_libs[book_id]:
+                    version[other] += 1
+
             current_day += lib.signup_days
-            
             used_libs.add(lib_id)
-            
-            if len(heap) > 0 and len(heap) % 1000 == 0:
-                new_heap = []
-                for neg_eff, lid in heap:
-                    if lid in used_libs:
-                        continue
-                        
-                    l = data.libs[lid]
-                    info = lib_info[lid]
-                    
-                    if current_day + l.signup_days >= data.num_days:
-                        continue
-                        
-                    days_left = data.num_days - (current_day + l.signup_days)
-                    max_scannable = min(days_left * l.books_per_day, len(l.books))
-                    
-                    unscanned = [b.id for b in info['sorted_books'] if b.id not in scanned_books]
-                    potential = sum(book_scores[b] for b in unscanned[:max_scannable])
-                    
-                    efficiency = potential / l.signup_days if l.signup_days > 0 else float('inf')
-                    if efficiency > 0:
-                        heapq.heappush(new_heap, (-efficiency, lid))
-                        
-                heap = new_heap
-        
+
         for lib_id in range(len(data.libs)):
             if lib_id not in used_libs:
                 unsigned_libs.append(lib_id)
@@ -363,13 +399,27 @@ class InitialSolution:
         return solution
 
     @staticmethod
-    def generate_initial_solution(data):
+    def generate_initial_solution(data, deadline=None):
+        """
+        Build solutions with every construction heuristic and return the best.
+
+        Args:
+            data: The problem data
+            deadline: Deadline of the construction phase; each heuristic gets
+                its PHASE_SHARES share of the time left when it starts
+
+        Returns:
+            The best constructed solution
+        """
+        deadline = Deadline.of(deadline)
         best_solution = None
         # print("\nGenerating solutions using different methods:")
         # print("-" * 50)
 
         best_alpha, best_beta, best_score, weighted_solution = (
-            InitialSolution.tune_weighted_efficiency_parameters(data, time_limit=60)
+            InitialSolution.tune_weighted_efficiency_parameters(
+                data, time_limit=60, deadline=deadline.sub(InitialSolution.PHASE_SHARES['weighted'])
+            )
         )
         # print(f"\nWeighted Efficiency Solution:")
         # print(f"Score: {weighted_solution.fitness_score}")
@@ -381,22 +431,29 @@ class InitialSolution:
             (
                 InitialSolution.generate_initial_greedy_heap,
                 {},
-                "Greedy"
+                "Greedy",
+                InitialSolution.PHASE_SHARES['greedy']
             ),
            
             (
                 InitialSolution.generate_initial_solution_grasp,
                 {"p": 0.03, "max_time": 15},
-                "GRASP"
+                "GRASP",
+                InitialSolution.PHASE_SHARES['grasp']
             ),
             (
                 InitialSolution.generate_initial_solution_sorted,
                 {},
-                "Sorted"
+                "Sorted",
+                None
             ),
         ]
 
-        for method, kwargs, method_name in generation_methods:
+        for method, kwargs, method_name, share in generation_methods:
+            if share is not None:
+                if deadline.expired():
+                    continue
+                kwargs = dict(kwargs, deadline=deadline.sub(share))
             try:
                 initial_solution = method(data, **kwargs)
                 # print(f"\n{method_name} Solution:")
@@ -419,3 +476,99 @@ class InitialSolution:
             raise Exception("No valid initial solution could be generated")
 
         return best_solution
+
+    @staticmethod
+    def portfolio_tasks():
+        """
+        Constructor runs of the initial-solution portfolio, in the order in
+        which generate_initial_solution considers them.
+        """
+        tasks = [
+            ('generate_initial_solution_weighted_efficiency', {'alpha': alpha, 'beta': beta}, 'Weighted')
+            for alpha in [1.0, 0.5, 1.5, 2.0]
+            for beta in [0.0, 0.05, 0.1, 0.2]
+        ]
+        tasks += [
+            ('generate_initial_greedy_heap', {}, 'Greedy'),
+            ('generate_initial_solution_grasp', {'p': 0.03, 'max_time': 15}, 'GRASP'),
+            ('generate_initial_solution_sorted', {}, 'Sorted'),
+        ]
+        return tasks
+
+    @staticmethod
+    def generate_initial_solution_parallel(data, deadline=None, num_workers=None, task_timeout=60):
+        """
+        Run the construction portfolio (every alpha/beta grid point, greedy
+        heap, GRASP and sorted) concurrently in a process pool and keep the
+        best solution, choosing among results as generate_initial_solution
+        does.
+
+        Args:
+            data: The problem data
+            deadline: Deadline of the construction phase; running
+                constructors stop adding libraries when it passes, and
+                the pool is terminated GRACE_SECONDS later
+            num_workers: Pool size (default: one per core)
+            task_timeout: Seconds each constructor may run
+
+        Returns:
+            The best constructed solution
+        """
+        deadline = Deadline.of(deadline)
+        tasks = InitialSolution.portfolio_tasks()
+        num_workers = min(len(tasks), num_workers or os.cpu_count() or 1)
+        if deadline.end == float('inf') and task_timeout is not None:
+            # Every worker runs its share of the tasks one after the other
+            deadline = Deadline(-(-len(tasks) // num_workers) * task_timeout)
+
+        context = multiprocessing.get_context()
+        # Leaving the block terminates the pool, killing constructors still
+        # running past the deadline instead of leaving them orphaned
+        with context.Pool(num_workers, initializer=InitialSolution._init_worker, initargs=(data,)) as pool:
+            results = [
+                pool.apply_async(InitialSolution._run_constructor,
+                                 (method_name, kwargs, deadline.end, task_timeout, random.getrandbits(64)))
+                for method_name, kwargs, _ in tasks
+            ]
+            pool.close()
+            for result in results:
+                result.wait(None if deadline.end == float('inf')
+                            else max(0.0, deadline.remaining() + InitialSolution.GRACE_SECONDS))
+
+        best_score = 0
+        best_solution = None
+        for result, (_, _, label) in zip(results, tasks):
+            if not result.ready():
+                continue
+            try:
+                solution = result.get()
+            except Exception as e:
+                print(f"Error generating solution with {label}: {e}")
+                continue
+            if solution is not None and solution.fitness_score > best_score:
+                best_score = solution.fitness_score
+                best_solution = solution
+
+        if best_solution is None:
+            # Nothing finished in time; the sorted builder is cheap and always succeeds
+            best_solution = InitialSolution.generate_initial_solution_sorted(data)
+        return best_solution
+
+    _worker_data = None
+
+    @staticmethod
+    def _init_worker(data):
+        InitialSolution._worker_data = data
+
+    @staticmethod
+    def _run_constructor(method_name, kwargs, deadline_end, timeout, seed):
+        random.seed(seed)
+        deadline = Deadline(end=deadline_end)
+        if timeout is not None:
+            deadline = deadline.sub(seconds=timeout)
+        if deadline.expired():
+            return None
+        method = getattr(InitialSolution, method_name)
+        if method_name != 'generate_initial_solution_sorted':
+            kwargs = dict(kwargs, deadline=deadline)
+        return method(InitialSolution._worker_data, **kwargs)
@@ -0,0 +1,162 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .instance_data import InstanceData
+
+
+class InstanceCache:
+    """
+    Compact binary image of an InstanceData, stored next to the text input.
+
+    Layout (little-endian):
+        header: magic, format version, SHA-256 of the text input,
+                num_books, num_libs, num_days, number of (library, book) pairs
+        int64 arrays: library prefix scores, library total scores
+        int32 arrays, in order: scores, signup days, books per day,
+                library offsets, library books, book offsets, book libraries
+
+    The header is 72 bytes, so the int64 arrays placed right after it stay
+    8-byte aligned.
+
+    Loading maps the file read-only and exposes the arrays as memoryviews, so
+    repeat runs skip tokenising and every process that loads the same cache
+    shares its pages.
+    """
+
+    MAGIC = b'BSIC'
+    FORMAT_VERSION = 2
+    SUFFIX = '.cache'
+    HEADER = struct.Struct('<4sI32sqqqq')
+    ITEM_SIZE = 4
+    WIDE_ITEM_SIZE = 8
+
+    @staticmethod
+    def cache_path(file_path):
+        return file_path + InstanceCache.SUFFIX
+
+    @staticmethod
+    def content_hash(file_path):
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.digest()
+
+    @staticmethod
+    def _wide_arrays(data):
+        return [data.lib_prefix_scores, data.lib_total_scores]
+
+    @staticmethod
+    def _arrays(data):
+        return [
+            data.scores,
+            data.lib_signup_days,
+            data.lib_books_per_day,
+            data.lib_offsets,
+            data.lib_books,
+            data.book_lib_offsets,
+            data.book_lib_ids,
+        ]
+
+    @staticmethod
+    def to_bytes(data, digest=bytes(32)):
+        """Serialise an instance into the cache layout."""
+        parts = [InstanceCache.HEADER.pack(
+            InstanceCache.MAGIC, InstanceCache.FORMAT_VERSION, digest,
+            data.num_books, data.num_libs, data.num_days, len(data.lib_books)
+        )]
+        for typecode, arrays in (('q', InstanceCache._wide_arrays(data)), ('i', InstanceCache._arrays(data))):
+            for values in arrays:
+                values = array(typecode, values)
+                if sys.byteorder != 'little':
+                    values.byteswap()
+                parts.append(values.tobytes())
+        return b''.join(parts)
+
+    @staticmethod
+    def from_buffer(buffer, digest=None):
+        """
+        Build an instance over a buffer in the cache layout without copying.
+        Returns None when the buffer does not hold a compatible image.
+        """
+        header_size = InstanceCache.HEADER.size
+        if len(buffer) < header_size:
+            return None
+        magic, version, stored_digest, num_books, num_libs, num_days, num_pairs = \
+            InstanceCache.HEADER.unpack_from(buffer)
+        if magic != InstanceCache.MAGIC or version != InstanceCache.FORMAT_VERSION:
+            return None
+        if digest is not None and digest != stored_digest:
+            return None
+
+        wide_lengths = [num_pairs + 1, num_libs]
+        lengths = [num_books, num_libs, num_libs, num_libs + 1, num_pairs, num_books + 1, num_pairs]
+        expected = (header_size + InstanceCache.WIDE_ITEM_SIZE * sum(wide_lengths)
+                    + InstanceCache.ITEM_SIZE * sum(lengths))
+        if len(buffer) != expected:
+            return None
+
+        view = memoryview(buffer)
+        arrays = []
+        offset = header_size
+        for typecode, item_size, length in (
+            [('q', InstanceCache.WIDE_ITEM_SIZE, length) for length in wide_lengths]
+            + [('i', InstanceCache.ITEM_SIZE, length) for length in lengths]
+        ):
+            end = offset + item_size * length
+            if sys.byteorder == 'little':
+                values = view[offset:end].cast(typecode)
+            else:
+                values = array(typecode, view[offset:end])
+                values.byteswap()
+            arrays.append(values)
+            offset = end
+
+        (lib_prefix_scores, lib_total_scores, scores, signup_days, books_per_day,
+         lib_offsets, lib_books, book_lib_offsets, book_lib_ids) = arrays
+        return InstanceData.from_arrays(
+            num_books, num_libs, num_days, scores, signup_days, books_per_day,
+            lib_offsets, lib_books, book_lib_offsets, book_lib_ids,
+            lib_prefix_scores, lib_total_scores
+        )
+
+    @staticmethod
+    def load(cache_path, digest=None):
+        """Memory-map a cache file; returns None if it is missing, stale or corrupt."""
+        try:
+            with open(cache_path, 'rb') as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return None
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            return None
+        try:
+            data = InstanceCache.from_buffer(buffer, digest)
+        except (struct.error, ValueError, TypeError):
+            data = None
+        if data is None:
+            try:
+                buffer.close()
+            except BufferError:
+                pass
+        return data
+
+    @staticmethod
+    def save(data, cache_path, digest):
+        """Write the cache atomically; failures (e.g. read-only input dirs) are ignored."""
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as file:
+                file.write(InstanceCache.to_bytes(data, digest))
+            os.replace(tmp_path, cache_path)
+            return True
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
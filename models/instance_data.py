@@ -1,22 +1,226 @@
+from array import array
+from itertools import accumulate
+
+from .library import Library
+
+
+class CSRRows:
+    """Read-only list-like view over the rows of a CSR (offsets, values) pair."""
+    __slots__ = ('offsets', 'values')
+
+    def __init__(self, offsets, values):
+        self.offsets = offsets
+        self.values = memoryview(values)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        offsets = self.offsets
+        values = self.values
+        for i in range(len(offsets) - 1):
+            yield values[offsets[i]:offsets[i + 1]]
+
+
 class InstanceData:
+    """
+    Problem instance backed by contiguous integer arrays.
+
+    scores                              - score of every book
+    lib_signup_days, lib_books_per_day  - per-library parameters
+    lib_offsets, lib_books              - library -> books CSR; the books of
+                                          each library are sorted by score
+                                          (descending, ties in input order)
+    book_lib_offsets, book_lib_ids      - book -> libraries CSR (inverse)
+    lib_prefix_scores                   - running score over lib_books, so the
+                                          best k books of library L score
+                                          P[off[L] + k] - P[off[L]] (int64)
+    lib_total_scores                    - score of all books of each library
+
+    `libs` and `book_libs` are thin views over these arrays so that code
+    written against Library/Book objects keeps working, while hot paths can
+    index the arrays directly.
+    """
     num_books = 0
     num_libs = 0
     num_days = 0
-    scores = []
-    libs = []
-    book_libs = []
     upper_bound = 0
+    # Original ids of a reduced instance (see InstanceReducer)
+    id_map = None
 
     def __init__(self, num_books, num_libs, num_days, scores, libs):
+        lib_offsets = array('i', [0])
+        lib_books = array('i')
+        for lib in libs:
+            lib_books.extend(lib.book_ids)
+            lib_offsets.append(len(lib_books))
+
+        self._set_arrays(
+            num_books, num_libs, num_days, array('i', scores),
+            array('i', (lib.signup_days for lib in libs)),
+            array('i', (lib.books_per_day for lib in libs)),
+            lib_offsets, lib_books
+        )
+        self.libs = libs
+
+    @classmethod
+    def from_arrays(cls, num_books, num_libs, num_days, scores, signup_days, books_per_day,
+                    lib_offsets, lib_books, book_lib_offsets=None, book_lib_ids=None,
+                    lib_prefix_scores=None, lib_total_scores=None):
+        """
+        Build an instance directly from its arrays. `lib_books` must hold the
+        books of every library already sorted by score (descending). The
+        inverse CSR and the score sums are derived when they are not supplied.
+        """
+        data = cls.__new__(cls)
+        data._set_arrays(num_books, num_libs, num_days, scores, signup_days, books_per_day,
+                         lib_offsets, lib_books, book_lib_offsets, book_lib_ids,
+                         lib_prefix_scores, lib_total_scores)
+        books = memoryview(lib_books)
+        data.libs = [
+            Library.view(i, signup_days[i], books_per_day[i],
+                         books[lib_offsets[i]:lib_offsets[i + 1]], scores)
+            for i in range(num_libs)
+        ]
+        return data
+
+    def __reduce__(self):
+        # The arrays may be memoryviews over a mapped cache file, which cannot
+        # be pickled; ship the instance as its cache image instead
+        from .instance_cache import InstanceCache
+        return InstanceData._from_image, (InstanceCache.to_bytes(self), self.id_map)
+
+    @staticmethod
+    def _from_image(image, id_map):
+        from .instance_cache import InstanceCache
+        data = InstanceCache.from_buffer(image)
+        data.id_map = id_map
+        return data
+
+    def _set_arrays(self, num_books, num_libs, num_days, scores, signup_days, books_per_day,
+                    lib_offsets, lib_books, book_lib_offsets=None, book_lib_ids=None,
+                    lib_prefix_scores=None, lib_total_scores=None):
         self.num_books = num_books
         self.num_libs = num_libs
         self.num_days = num_days
         self.scores = scores
-        self.libs = libs
-        self.book_libs = [[] for _ in range(num_books)]
-        for i, lib in enumerate(libs):
-            for book in lib.books:
-                self.book_libs[book.id].append(i)
+        self.lib_signup_days = signup_days
+        self.lib_books_per_day = books_per_day
+        self.lib_offsets = lib_offsets
+        self.lib_books = lib_books
+
+        if book_lib_offsets is None:
+            book_lib_offsets, book_lib_ids = InstanceData._invert(num_books, lib_offsets, lib_books)
+        self.book_lib_offsets = book_lib_offsets
+        self.book_lib_ids = book_lib_ids
+        self.book_libs = CSRRows(book_lib_offsets, book_lib_ids)
+
+        if lib_prefix_scores is None:
+            lib_prefix_scores = array('q', [0])
+            lib_prefix_scores.extend(accumulate(map(scores.__getitem__, lib_books)))
+            lib_total_scores = array('q', (
+                lib_prefix_scores[lib_offsets[i + 1]] - lib_prefix_scores[lib_offsets[i]]
+                for i in range(num_libs)
+            ))
+        self.lib_prefix_scores = lib_prefix_scores
+        self.lib_total_scores = lib_total_scores
+
+    def library_components(self):
+        """
+        Connected components of the library-book graph, as lists of library
+        ids (increasing), largest first. Libraries in different components
+        share no book, directly or transitively, so they only compete for
+        signup days. Computed with union-find over book_libs and cached.
+        """
+        components = self.__dict__.get('_components')
+        if components is not None:
+            return components
+
+        parent = list(range(self.num_libs))
+
+        def find(lib_id):
+            while parent[lib_id] != lib_id:
+                parent[lib_id] = parent[parent[lib_id]]
+                lib_id = parent[lib_id]
+            return lib_id
+
+        offsets = self.book_lib_offsets
+        lib_ids = self.book_lib_ids
+        for book_id in range(self.num_books):
+            lo, hi = offsets[book_id], offsets[book_id + 1]
+            if hi - lo < 2:
+                continue
+            root = find(lib_ids[lo])
+            for other in lib_ids[lo + 1:hi]:
+                other = find(other)
+                if other != root:
+                    parent[other] = root
+
+        groups = {}
+        for lib_id in range(self.num_libs):
+            groups.setdefault(find(lib_id), []).append(lib_id)
+        components = sorted(groups.values(), key=len, reverse=True)
+        self._components = components
+        return components
+
+    def top_score(self, lib_id, k, scanned_books=None):
+        """
+        Score of the best `k` books of a library, in O(1).
+
+        With `scanned_books`, the best `k` books not scanned yet are scored
+        instead. Their selection costs a first_unscanned walk, but the sum
+        takes the fast path of selection_score() whenever none of the
+        library's leading books is scanned.
+        """
+        if scanned_books is not None:
+            lo, hi = self.lib_offsets[lib_id], self.lib_offsets[lib_id + 1]
+            books = scanned_books.first_unscanned(self.lib_books[lo:hi], k)
+            return self.selection_score(lib_id, books)
+        lo = self.lib_offsets[lib_id]
+        k = max(0, min(k, self.lib_offsets[lib_id + 1] - lo))
+        return self.lib_prefix_scores[lo + k] - self.lib_prefix_scores[lo]
+
+    def selection_score(self, lib_id, books, offset=0):
+        """
+        Score of `books`, a selection made in order from the library's books
+        starting at position `offset` (e.g. by first_unscanned).
+
+        Fast path: if the last selected book sits at position offset + n - 1,
+        no book was skipped, so the selection is a contiguous run and its
+        score is a difference of prefix sums. Otherwise some of the books
+        were already scanned and the selection is summed directly.
+        """
+        n = len(books)
+        if not n:
+            return 0
+        lo = self.lib_offsets[lib_id] + offset
+        if self.lib_books[lo + n - 1] == books[-1]:
+            return self.lib_prefix_scores[lo + n] - self.lib_prefix_scores[lo]
+        return sum(map(self.scores.__getitem__, books))
+
+    @staticmethod
+    def _invert(num_books, lib_offsets, lib_books):
+        """Build the book -> libraries CSR; libraries of a book are in id order."""
+        counts = [0] * (num_books + 1)
+        for book_id in lib_books:
+            counts[book_id + 1] += 1
+        for i in range(num_books):
+            counts[i + 1] += counts[i]
+        offsets = array('i', counts)
+
+        cursor = counts[:-1]
+        lib_ids = array('i', bytes(4 * len(lib_books)))
+        for lib_id in range(len(lib_offsets) - 1):
+            for j in range(lib_offsets[lib_id], lib_offsets[lib_id + 1]):
+                book_id = lib_books[j]
+                lib_ids[cursor[book_id]] = lib_id
+                cursor[book_id] += 1
+        return offsets, lib_ids
 
     def describe(self):
         print('There are', self.num_books, "books", self.num_libs, "libraries", "and", self.num_days, "days for scanning")
@@ -27,22 +231,15 @@ class InstanceData:
         for i,l in enumerate(self.libs):
             print(f'Library {l.id} has {l.num_books} books, the signup process takes {l.signup_days} days, and the library can ship {l.books_per_day} books per day.')
             print(f'The books in library {l.id}  are: ' + ', '.join(f'book {x}' for x in l.books[:-1]) + f', and book {l.books[-1]}.')
-            
+
         print()
 
         for i,l in enumerate(self.book_libs):
             print(f'Book {i} Exists in Libraries:', ' and '.join(str(x) for x in l))
-            
+
     def calculate_upper_bound(self):
         """Calculates the sum of scores of all unique books across all libraries."""
-        unique_books = set()
-        
-        # Collect all unique book IDs
-        for lib in self.libs:
-            for book in lib.books:
-                unique_books.add(book.id)  
-
-        # Sum up their scores
-        upper_bound = sum(self.scores[book_id] for book_id in unique_books)
+        # Sum up the scores of all books that appear in at least one library
+        scores = self.scores
+        upper_bound = sum(scores[book_id] for book_id in set(self.lib_books))
         return upper_bound
-
@@ -0,0 +1,212 @@
+import heapq
+import random
+import time
+
+from models.batch_evaluator import BatchEvaluator
+from models.candidate_list import CandidateList
+from models.deadline import Deadline
+from models.moves import InsertMove
+from models.operator_selector import AdaptiveOperatorSelector
+from models.overlap_index import OverlapIndex
+from models.rebuild_engine import RebuildEngine
+from models.solution import Solution
+
+
+class LargeNeighbourhoodSearch:
+    """
+    Destroy-and-repair search over the signed library order.
+
+    Each iteration removes `size` signed libraries with one of the destroy
+    operators and repairs the order greedily:
+        random     - positions drawn uniformly
+        related    - a library and signed libraries sharing books with it,
+                     grown through the OverlapIndex
+        worst      - libraries among those scoring least per signup day
+        window     - a contiguous run of positions, i.e. the libraries that
+                     sign up in one stretch of days
+    The destroy operator is picked by an AdaptiveOperatorSelector rewarded
+    with fitness gain per CPU-second. The destroy size starts at MIN_SIZE,
+    grows by one after `patience` iterations without a new best and drops
+    back to MIN_SIZE when one is found.
+
+    The repair keeps the removed libraries and the best unsigned ones of the
+    CandidateList in a max-heap keyed by their gain. Gains start from the
+    candidate bound and are refreshed lazily: the top candidate is scored
+    exactly at up to MAX_SLOTS of the freed positions (and those next to
+    libraries inserted since) with BatchEvaluator, and inserted only if its
+    exact gain still tops the heap; otherwise it goes back with the new key.
+    Insertions commit through the RebuildEngine, so only the suffix after
+    the insert is rebuilt.
+    """
+    DESTROY_OPERATORS = {'random': 1.0, 'related': 1.0, 'worst': 1.0, 'window': 1.0}
+    MIN_SIZE = 2
+    MAX_SIZE = 30
+    # Largest share of the signed order removed at once
+    MAX_SHARE = 0.3
+    PATIENCE = 10
+    MAX_SLOTS = 8
+
+    def __init__(self, patience=PATIENCE):
+        self.selector = AdaptiveOperatorSelector(weights=self.DESTROY_OPERATORS)
+        self.destroyers = {
+            'random': self._destroy_random,
+            'related': self._destroy_related,
+            'worst': self._destroy_worst,
+            'window': self._destroy_window,
+        }
+        self.patience = patience
+        self.size = self.MIN_SIZE
+        self.iterations = 0
+        self.accepted = 0
+
+    def search(self, solution, data, time_limit=60.0, max_iterations=float('inf'), deadline=None):
+        """
+        Improve `solution` by destroy and repair until the time limit.
+
+        Args:
+            solution: The solution to start from
+            data: The problem data
+            time_limit: Maximum time to spend in seconds
+            max_iterations: Maximum number of destroy-repair iterations
+            deadline: Global Deadline of the run
+
+        Returns:
+            The best solution found
+        """
+        deadline = Deadline.of(deadline, time_limit)
+        best_solution = current = solution
+        stale = 0
+        iterations = 0
+
+        while not deadline.expired() and iterations < max_iterations and current.signed_libraries:
+            operator = self.selector.choose()
+            cpu_start = time.process_time()
+
+            max_size = max(self.MIN_SIZE, min(self.MAX_SIZE, int(len(current.signed_libraries) * self.MAX_SHARE)))
+            size = min(self.size, max_size, len(current.signed_libraries))
+            positions = self.destroyers[self.selector.names[operator]](current, data, size)
+            destroyed, removed, slots = self.destroy(current, data, positions)
+            candidate = self.repair(destroyed, data, removed, slots, deadline)
+
+            gain = max(0, candidate.fitness_score - current.fitness_score)
+            self.selector.update(operator, gain, time.process_time() - cpu_start)
+            if candidate.fitness_score >= current.fitness_score:
+                current = candidate
+                self.accepted += 1
+            if current.fitness_score > best_solution.fitness_score:
+                best_solution = current
+                self.size = self.MIN_SIZE
+                stale = 0
+            else:
+                stale += 1
+                if stale >= self.patience:
+                    self.size = min(self.size + 1, max_size)
+                    stale = 0
+            iterations += 1
+
+        self.iterations += iterations
+        return best_solution
+
+    @staticmethod
+    def destroy(solution, data, positions):
+        """
+        Remove the signed libraries at `positions` and rebuild the rest.
+
+        Returns:
+            (destroyed solution, removed library ids, freed positions in the
+            destroyed order)
+        """
+        positions = sorted(positions)
+        removed = [solution.signed_libraries[pos] for pos in positions]
+        removed_set = set(positions)
+        destroyed = Solution(
+            [lib_id for pos, lib_id in enumerate(solution.signed_libraries) if pos not in removed_set],
+            solution.unsigned_libraries + removed,
+            {},
+            set()
+        )
+        destroyed = RebuildEngine.rebuild(destroyed, data, base=solution, start=positions[0])
+        slots = sorted({min(pos - k, len(destroyed.signed_libraries)) for k, pos in enumerate(positions)})
+        return destroyed, removed, slots
+
+    def repair(self, solution, data, removed, slots, deadline=None):
+        """
+        Greedily insert the removed libraries and the best unsigned ones into
+        `solution`, best exact gain first. Returns the repaired solution.
+        """
+        candidates = CandidateList.of(data)
+        pool = set(removed)
+        # top() syncs the candidate bounds with the destroyed solution
+        pool.update(solution.unsigned_libraries[i] for i in candidates.top(solution))
+        heap = [(-candidates.bound(lib_id), -1, lib_id, None) for lib_id in pool]
+        heapq.heapify(heap)
+
+        # Entries scored against the current version carry their exact move
+        version = 0
+        while heap and heap[0][0] < 0 and not (deadline is not None and deadline.expired()):
+            _, scored_at, lib_id, pos = heapq.heappop(heap)
+            if scored_at != version:
+                pos, gain = self._best_insert(solution, data, lib_id, slots)
+                if gain > 0:
+                    heapq.heappush(heap, (-gain, version, lib_id, pos))
+                continue
+
+            unsigned_idx = solution.unsigned_libraries.index(lib_id)
+            solution = InsertMove(unsigned_idx, pos).commit(solution, data)
+            slots = sorted({slot + (slot > pos) for slot in slots} | {pos + 1})
+            version += 1
+        return solution
+
+    def _best_insert(self, solution, data, lib_id, slots):
+        """(position, gain) of the best insert of `lib_id` among the slots."""
+        if len(slots) > self.MAX_SLOTS:
+            slots = random.sample(slots, self.MAX_SLOTS)
+        unsigned_idx = solution.unsigned_libraries.index(lib_id)
+        moves = [InsertMove(unsigned_idx, min(slot, len(solution.signed_libraries))) for slot in slots]
+        move, fitness = BatchEvaluator.best(solution, data, moves)
+        return move.start, fitness - solution.fitness_score
+
+    @staticmethod
+    def _destroy_random(solution, data, size):
+        return random.sample(range(len(solution.signed_libraries)), size)
+
+    @staticmethod
+    def _destroy_related(solution, data, size):
+        overlap = OverlapIndex.of(data)
+        positions = [random.randint(0, len(solution.signed_libraries) - 1)]
+        chosen = set(positions)
+        for _ in range(4 * size):
+            if len(positions) >= size:
+                break
+            pos = overlap.signed_neighbour(solution, random.choice(positions))
+            if pos is not None and pos not in chosen:
+                positions.append(pos)
+                chosen.add(pos)
+        # Libraries without enough signed neighbours are topped up at random
+        rest = [pos for pos in range(len(solution.signed_libraries)) if pos not in chosen]
+        return positions + random.sample(rest, size - len(positions))
+
+    @staticmethod
+    def _destroy_worst(solution, data, size):
+        signed = solution.signed_libraries
+        per_lib = solution.scanned_books_per_library
+        efficiency = [
+            data.selection_score(lib_id, per_lib.get(lib_id, ())) / max(1, data.lib_signup_days[lib_id])
+            for lib_id in signed
+        ]
+        ranked = sorted(range(len(signed)), key=efficiency.__getitem__)
+        return random.sample(ranked[:2 * size], size)
+
+    @staticmethod
+    def _destroy_window(solution, data, size):
+        start = random.randint(0, len(solution.signed_libraries) - size)
+        return range(start, start + size)
+
+    def summary(self):
+        """Statistics for the run summary."""
+        return {
+            'iterations': self.iterations,
+            'accepted': self.accepted,
+            'destroy_size': self.size,
+            'operators': self.selector.summary(),
+        }
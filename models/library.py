@@ -1,11 +1,39 @@
+from collections.abc import Sequence
+
 from .book import Book
 
+
+class BookView(Sequence):
+    """
+    Read-only sequence of the books of a library over its book ids; Book
+    objects are created only for the items accessed.
+    """
+    __slots__ = ('book_ids', 'book_scores')
+
+    def __init__(self, book_ids, book_scores):
+        self.book_ids = book_ids
+        self.book_scores = book_scores
+
+    def __len__(self):
+        return len(self.book_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return BookView(self.book_ids[index], self.book_scores)
+        book_id = self.book_ids[index]
+        return Book(book_id, self.book_scores[book_id])
+
+    def __iter__(self):
+        scores = self.book_scores
+        for book_id in self.book_ids:
+            yield Book(book_id, scores[book_id])
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 class Library:
-    id = 0
-    num_books = 0
-    signup_days = 0
-    books_per_day = 0
-    books = []
+    __slots__ = ('id', 'num_books', 'signup_days', 'books_per_day', 'book_ids', 'book_scores')
     _id_counter = 0
 
     def __init__(self, num_books, signup_days, books_per_day, books, book_scores):
@@ -14,7 +42,28 @@ class Library:
         self.num_books = num_books
         self.signup_days = signup_days
         self.books_per_day = books_per_day
-        self.books = sorted([Book(x, book_scores[x]) for x in books], key=lambda x: x.score, reverse=True)
+        self.book_ids = sorted(books, key=lambda x: book_scores[x], reverse=True)
+        self.book_scores = book_scores
+
+    @classmethod
+    def view(cls, id, signup_days, books_per_day, book_ids, book_scores):
+        """
+        Create a library over book ids that are already sorted by score
+        (descending), e.g. a slice of InstanceData.lib_books.
+        """
+        library = cls.__new__(cls)
+        library.id = id
+        library.num_books = len(book_ids)
+        library.signup_days = signup_days
+        library.books_per_day = books_per_day
+        library.book_ids = book_ids
+        library.book_scores = book_scores
+        return library
+
+    @property
+    def books(self):
+        """Books sorted by score (descending), as a BookView over book_ids."""
+        return BookView(self.book_ids, self.book_scores)
 
     def __repr__(self):
-        return f"Library({self.id}, {self.num_books}, {self.signup_days}, {self.books_per_day}, {self.books})"
\ No newline at end of file
+        return f"Library({self.id}, {self.num_books}, {self.signup_days}, {self.books_per_day}, {self.books})"
@@ -1,9 +1,11 @@
 import time
-from models.tweaks import Tweaks
+from models.deadline import Deadline
+from models.move_bound import MoveBound
+from models.operator_selector import AdaptiveOperatorSelector
 
 class LocalSearch:
     @staticmethod
-    def local_search(solution, data, time_limit=60.0, max_iterations=1000):
+    def local_search(solution, data, time_limit=60.0, max_iterations=1000, deadline=None, selector=None):
         """
         Perform local search on the given solution using various tweak methods.
         
@@ -12,19 +14,36 @@ class LocalSearch:
             data: The problem data
             time_limit: Maximum time to spend on local search in seconds
             max_iterations: Maximum number of iterations to perform
+            deadline: Global Deadline of the run; the search stops at
+                whichever of time_limit and the deadline comes first
+            selector: AdaptiveOperatorSelector that picks the neighbourhoods;
+                pass the same one across calls to keep what it has learned
             
         Returns:
             The best solution found during local search
         """
-        start_time = time.time()
+        deadline = Deadline.of(deadline, time_limit)
+        if selector is None:
+            selector = AdaptiveOperatorSelector()
+        bound = MoveBound.of(data)
         best_solution = solution
         iterations = 0
         
-        while (time.time() - start_time < time_limit) and (iterations < max_iterations):
-            tweak_method = Tweaks.choose_tweak_method()
-            new_solution = tweak_method(best_solution, data)
-            if new_solution.fitness_score > best_solution.fitness_score:
-                best_solution = new_solution
+        while not deadline.expired() and (iterations < max_iterations):
+            operator = selector.choose()
+            cpu_start = time.process_time()
+            gain = 0
+
+            # Skip moves whose bound cannot beat the incumbent, score the rest
+            # in place; only improving moves build a new solution
+            move = selector.propose(operator, best_solution, data)
+            if move is not None and not bound.prunes(move, best_solution, data):
+                fitness = move.evaluate(best_solution, data)
+                if fitness > best_solution.fitness_score:
+                    gain = fitness - best_solution.fitness_score
+                    best_solution = move.commit(best_solution, data)
+
+            selector.update(operator, gain, time.process_time() - cpu_start)
             iterations += 1
         
         return best_solution 
\ No newline at end of file
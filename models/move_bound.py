@@ -0,0 +1,101 @@
+import weakref
+
+from models.rebuild_engine import RebuildEngine
+
+
+class MoveBound:
+    """
+    Cheap optimistic bound on the fitness of a library order, used to skip
+    moves that cannot beat the incumbent without simulating them.
+
+    Every library after the resume point is credited with the score of the
+    best books it could ship from the earliest day its signup could end,
+    ignoring books already scanned by other libraries; the prefix sums of
+    InstanceData make each library O(1).
+
+    A library left without unscanned books is skipped and does not advance
+    the clock, so only libraries holding a book no other library holds
+    (`must_sign`) are charged their signup days, and the clock is kept as a
+    lower bound on the real one. The bound is therefore never below the
+    fitness the order really reaches, and pruning never skips an
+    improving move. One bound is kept per instance (see of()).
+    """
+    _instances = weakref.WeakKeyDictionary()
+
+    def __init__(self, data):
+        self.data = data
+        # Libraries that sign up whenever they fit: some book of theirs can
+        # only ever be scanned by them
+        book_lib_offsets = data.book_lib_offsets
+        unique = bytearray(
+            book_lib_offsets[b + 1] - book_lib_offsets[b] == 1 for b in range(data.num_books)
+        )
+        offsets = data.lib_offsets
+        lib_books = data.lib_books
+        self.must_sign = bytearray(
+            any(unique[b] for b in lib_books[offsets[lib_id]:offsets[lib_id + 1]])
+            for lib_id in range(data.num_libs)
+        )
+        self.checked = 0
+        self.pruned = 0
+
+    @staticmethod
+    def of(data):
+        """Return the bound of an instance, creating it on first use."""
+        bound = MoveBound._instances.get(data)
+        if bound is None:
+            bound = MoveBound(data)
+            MoveBound._instances[data] = bound
+        return bound
+
+    def suffix_bound(self, order, start, curr_time, fitness, margin=RebuildEngine.TWEAK_MARGIN):
+        """
+        Bound the fitness of `order` given the time and fitness before
+        position `start` (the same state score_suffix() starts from).
+
+        `curr_time` is a lower bound on the real clock throughout: a library
+        that must sign advances it, but when it fits only on some of the
+        clocks still possible it may instead be skipped on a later one, so
+        the clock moves to the earliest outcome of the two.
+        """
+        data = self.data
+        must_sign = self.must_sign
+        signup_days = data.lib_signup_days
+        books_per_day = data.lib_books_per_day
+        offsets = data.lib_offsets
+        prefix = data.lib_prefix_scores
+        num_days = data.num_days
+        last_day = num_days - margin
+
+        for lib_id in order[start:]:
+            signup_end = curr_time + signup_days[lib_id]
+            if signup_end >= last_day:
+                continue
+            lo = offsets[lib_id]
+            k = min((num_days - signup_end) * books_per_day[lib_id], offsets[lib_id + 1] - lo)
+            fitness += prefix[lo + k] - prefix[lo]
+            if must_sign[lib_id]:
+                curr_time = min(signup_end, last_day - signup_days[lib_id])
+        return fitness
+
+    def prunes(self, move, solution, data):
+        """
+        Return True if `move` cannot improve on solution.fitness_score and
+        may be skipped.
+        """
+        self.checked += 1
+        bound = move.upper_bound(solution, data)
+        if bound is None or bound > solution.fitness_score:
+            return False
+        self.pruned += 1
+        return True
+
+    def prune_rate(self):
+        return self.pruned / self.checked if self.checked else 0.0
+
+    def stats(self):
+        return {
+            'checked': self.checked,
+            'pruned': self.pruned,
+            'prune_rate': self.prune_rate(),
+        }
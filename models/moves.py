@@ -0,0 +1,351 @@
+import random
+from bisect import insort
+
+from models.fitness_cache import FitnessCache
+from models.move_bound import MoveBound
+from models.overlap_index import OverlapIndex
+from models.rebuild_engine import RebuildEngine
+from models.solution import Solution
+
+
+class Move:
+    """
+    Lightweight description of a change to the library order of a solution.
+
+    A move is scored in place: it is applied to the solution's lists, the
+    changed suffix is simulated on a copy of the scanned-book bitmap, and the
+    lists are restored. Only commit() allocates a new Solution, so rejected
+    moves cost no copies of the order, the per-library books or the
+    scanned-book set. Orders already scored are answered from the
+    instance's FitnessCache, keyed by the hash of the order after the move.
+
+    Attributes:
+        start: First position of the signed order changed by the move
+    """
+    __slots__ = ('start',)
+
+    def __init__(self, start):
+        self.start = start
+
+    def apply(self, solution):
+        """Apply the move to solution's library lists in place."""
+        raise NotImplementedError
+
+    def undo(self, solution):
+        """Revert apply() on the same solution."""
+        raise NotImplementedError
+
+    def order_key(self, solution, hasher):
+        """
+        Return the FitnessCache key of the order after the move, or None if
+        the move cannot be hashed.
+        """
+        return None
+
+    @staticmethod
+    def _base_hashes(solution, hasher):
+        hashes = solution.checkpoint_hash
+        if hashes is None or len(hashes) != len(solution.signed_libraries) + 1:
+            # Solutions built outside RebuildEngine get their hashes on first use
+            hashes = solution.checkpoint_hash = hasher.prefix_hashes(solution.signed_libraries)
+        return hashes
+
+    def evaluate(self, solution, data):
+        """
+        Return the fitness the solution would have after the move. The
+        solution is left unchanged.
+        """
+        cache = FitnessCache.of(data)
+        key = self.order_key(solution, cache.hasher)
+        fitness = cache.get(key)
+        if fitness is None:
+            fitness = self.simulate(solution, data)
+            cache.put(key, fitness)
+        return fitness
+
+    def upper_bound(self, solution, data):
+        """
+        Return an optimistic bound on the fitness after the move (see
+        MoveBound), or None if the move has no cheap bound.
+        """
+        start = RebuildEngine.resume_index(solution, self.start, RebuildEngine.TWEAK_MARGIN, True)
+        curr_time = solution.checkpoint_times[start] if start else 0
+        fitness = solution.checkpoint_scores[start] if start else 0
+        self.apply(solution)
+        try:
+            return MoveBound.of(data).suffix_bound(solution.signed_libraries, start, curr_time, fitness)
+        finally:
+            self.undo(solution)
+
+    def simulate(self, solution, data):
+        """Score the move by simulating the changed suffix."""
+        start, scanned_books, curr_time, fitness = RebuildEngine.prefix_state(solution, data, self.start)
+        self.apply(solution)
+        try:
+            return RebuildEngine.score_suffix(
+                solution.signed_libraries, data, start, scanned_books, curr_time, fitness
+            )
+        finally:
+            self.undo(solution)
+
+    def commit(self, solution, data):
+        """Return a new, rebuilt solution with the move applied."""
+        new_solution = Solution(
+            solution.signed_libraries.copy(),
+            solution.unsigned_libraries.copy(),
+            {},
+            set()
+        )
+        self.apply(new_solution)
+        return RebuildEngine.rebuild(new_solution, data, base=solution, start=self.start)
+
+
+class SwapMove(Move):
+    """Exchange the signed libraries at positions i and j."""
+    __slots__ = ('i', 'j')
+
+    def __init__(self, i, j):
+        super().__init__(min(i, j))
+        self.i = i
+        self.j = j
+
+    def apply(self, solution):
+        signed = solution.signed_libraries
+        signed[self.i], signed[self.j] = signed[self.j], signed[self.i]
+
+    undo = apply
+
+    def order_key(self, solution, hasher):
+        hashes = Move._base_hashes(solution, hasher)
+        signed = solution.signed_libraries
+        a, b = signed[self.i], signed[self.j]
+        order_hash = (hashes[-1] + hasher.term(b, self.i) + hasher.term(a, self.j)
+                      - hasher.term(a, self.i) - hasher.term(b, self.j)) % hasher.MODULUS
+        return order_hash, len(signed)
+
+
+class ReplaceMove(Move):
+    """Exchange the signed library at `signed_idx` with the unsigned one at `unsigned_idx`."""
+    __slots__ = ('unsigned_idx',)
+
+    def __init__(self, signed_idx, unsigned_idx):
+        super().__init__(signed_idx)
+        self.unsigned_idx = unsigned_idx
+
+    def apply(self, solution):
+        signed = solution.signed_libraries
+        unsigned = solution.unsigned_libraries
+        signed[self.start], unsigned[self.unsigned_idx] = unsigned[self.unsigned_idx], signed[self.start]
+
+    undo = apply
+
+    def order_key(self, solution, hasher):
+        hashes = Move._base_hashes(solution, hasher)
+        signed = solution.signed_libraries
+        old_id, new_id = signed[self.start], solution.unsigned_libraries[self.unsigned_idx]
+        order_hash = (hashes[-1] + hasher.term(new_id, self.start)
+                      - hasher.term(old_id, self.start)) % hasher.MODULUS
+        return order_hash, len(signed)
+
+
+class InsertMove(Move):
+    """Move the unsigned library at `unsigned_idx` into the signed order at `position`."""
+    __slots__ = ('unsigned_idx',)
+
+    def __init__(self, unsigned_idx, position):
+        super().__init__(position)
+        self.unsigned_idx = unsigned_idx
+
+    def apply(self, solution):
+        lib_id = solution.unsigned_libraries.pop(self.unsigned_idx)
+        solution.signed_libraries.insert(self.start, lib_id)
+
+    def undo(self, solution):
+        lib_id = solution.signed_libraries.pop(self.start)
+        solution.unsigned_libraries.insert(self.unsigned_idx, lib_id)
+
+    def order_key(self, solution, hasher):
+        hashes = Move._base_hashes(solution, hasher)
+        pos = self.start
+        lib_id = solution.unsigned_libraries[self.unsigned_idx]
+        suffix = hasher.shift(hashes[-1] - hashes[pos], 1)
+        order_hash = (hashes[pos] + hasher.term(lib_id, pos) + suffix) % hasher.MODULUS
+        return order_hash, len(solution.signed_libraries) + 1
+
+
+class RebuildMove(Move):
+    """Keep the order as is; committing re-runs the greedy book assignment."""
+    __slots__ = ()
+
+    def apply(self, solution):
+        pass
+
+    undo = apply
+
+    def order_key(self, solution, hasher):
+        if solution.reassigned_from is not None:
+            # Behind reassigned books the result depends on where the rebuild starts
+            return None
+        return Move._base_hashes(solution, hasher)[-1], len(solution.signed_libraries)
+
+
+class CrossoverMove(Move):
+    """
+    Split the signed order at `point` and keep the better half as the new
+    order, moving the other half to the unsigned libraries.
+    """
+    __slots__ = ('point', 'keep_prefix', 'saved')
+
+    def __init__(self, point):
+        super().__init__(point)
+        self.point = point
+        self.keep_prefix = None
+        self.saved = None
+
+    def evaluate(self, solution, data):
+        point = self.point
+        cache = FitnessCache.of(data)
+        hashes = Move._base_hashes(solution, cache.hasher)
+        n = len(solution.signed_libraries)
+        prefix_key = (hashes[point], point)
+        suffix_key = (cache.hasher.shift(hashes[-1] - hashes[point], -point), n - point)
+
+        prefix_fitness = cache.get(prefix_key)
+        if prefix_fitness is None:
+            start, scanned_books, curr_time, fitness = RebuildEngine.prefix_state(solution, data, point)
+            prefix_fitness = RebuildEngine.score_suffix(
+                solution.signed_libraries[:point], data, start, scanned_books, curr_time, fitness
+            )
+            cache.put(prefix_key, prefix_fitness)
+
+        suffix_fitness = cache.get(suffix_key)
+        if suffix_fitness is None:
+            _, scanned_books, curr_time, fitness = RebuildEngine.prefix_state(None, data, 0)
+            suffix_fitness = RebuildEngine.score_suffix(
+                solution.signed_libraries[point:], data, 0, scanned_books, curr_time, fitness
+            )
+            cache.put(suffix_key, suffix_fitness)
+
+        self.keep_prefix = prefix_fitness > suffix_fitness
+        self.start = point if self.keep_prefix else 0
+        return max(prefix_fitness, suffix_fitness)
+
+    def upper_bound(self, solution, data):
+        return None
+
+    def apply(self, solution):
+        signed = solution.signed_libraries
+        unsigned = solution.unsigned_libraries
+        self.saved = (signed, unsigned)
+        if self.keep_prefix:
+            solution.signed_libraries = signed[:self.point]
+            solution.unsigned_libraries = unsigned + signed[self.point:]
+        else:
+            solution.signed_libraries = signed[self.point:]
+            solution.unsigned_libraries = unsigned + signed[:self.point]
+
+    def undo(self, solution):
+        solution.signed_libraries, solution.unsigned_libraries = self.saved
+        self.saved = None
+
+    def commit(self, solution, data):
+        if self.keep_prefix is None:
+            self.evaluate(solution, data)
+        return super().commit(solution, data)
+
+
+class BookChainMove(Move):
+    """
+    Book-level move that keeps the library order and reassigns books.
+
+    `gainer` adds its best unscanned book `gained`; if it has no spare
+    capacity it first hands a book it shares to another signed library.
+    Each `links` entry (giver, receiver, book) moves a scanned book between
+    two libraries holding it; a receiver at capacity hands on its lowest
+    book in the next link. The last book that finds no taker is `dropped`
+    as (lib_id, book), or None. Only the gained and dropped books change the
+    fitness, so the move is scored in O(chain length).
+
+    Committing does not rebuild: the books are moved in a copy of the
+    solution, checkpoint scores are shifted by the moved scores, and the
+    order hashes past the first touched position are salted, since the
+    order alone no longer determines the fitness there.
+    """
+    __slots__ = ('gainer', 'gained', 'links', 'dropped', 'delta')
+
+    def __init__(self, start, gainer, gained, links=(), dropped=None, delta=0):
+        super().__init__(start)
+        self.gainer = gainer
+        self.gained = gained
+        self.links = list(links)
+        self.dropped = dropped
+        self.delta = delta
+
+    def apply(self, solution):
+        pass
+
+    undo = apply
+
+    def evaluate(self, solution, data):
+        return solution.fitness_score + self.delta
+
+    def upper_bound(self, solution, data):
+        return None
+
+    def commit(self, solution, data):
+        positions = OverlapIndex.of(data).positions(solution)
+        scores = data.scores
+        per_lib = solution.scanned_books_per_library.copy()
+
+        def books_of(lib_id):
+            books = per_lib.setdefault(lib_id, [])
+            if books is solution.scanned_books_per_library.get(lib_id):
+                books = per_lib[lib_id] = list(books)
+            return books
+
+        # Score of each position, applied as running differences
+        shift = [0] * (len(solution.signed_libraries) + 1)
+
+        def move_score(score, pos, sign):
+            shift[pos + 1] += sign * score
+
+        scanned_books = solution.scanned_books.copy()
+        for giver, receiver, book in self.links:
+            books_of(giver).remove(book)
+            insort(books_of(receiver), book, key=lambda b: -scores[b])
+            move_score(scores[book], positions[giver], -1)
+            move_score(scores[book], positions[receiver], 1)
+        if self.dropped is not None:
+            lib_id, book = self.dropped
+            books_of(lib_id).remove(book)
+            scanned_books.discard(book)
+            move_score(scores[book], positions[lib_id], -1)
+        insort(books_of(self.gainer), self.gained, key=lambda b: -scores[b])
+        scanned_books.add(self.gained)
+        move_score(scores[self.gained], positions[self.gainer], 1)
+
+        new_solution = Solution(
+            solution.signed_libraries.copy(),
+            solution.unsigned_libraries.copy(),
+            per_lib,
+            scanned_books
+        )
+        new_solution.fitness_score = solution.fitness_score + self.delta
+        new_solution.copy_checkpoints(solution)
+
+        running = 0
+        checkpoint_scores = list(solution.checkpoint_scores)
+        for i in range(len(checkpoint_scores)):
+            running += shift[i]
+            checkpoint_scores[i] += running
+        new_solution.checkpoint_scores = checkpoint_scores
+
+        hasher = FitnessCache.of(data).hasher
+        hashes = Move._base_hashes(solution, hasher)
+        salt = random.getrandbits(61)
+        new_solution.checkpoint_hash = hashes[:self.start + 1] + [
+            (h + salt) % hasher.MODULUS for h in hashes[self.start + 1:]
+        ]
+        if solution.reassigned_from is None or self.start < solution.reassigned_from:
+            new_solution.reassigned_from = self.start
+        return new_solution
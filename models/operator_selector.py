@@ -0,0 +1,72 @@
+import random
+
+from models.tweaks import Tweaks
+
+
+class AdaptiveOperatorSelector:
+    """
+    Adaptive pursuit over the local-search neighbourhoods.
+
+    Each operator keeps a running estimate of its reward, the fitness gain
+    per CPU-second it delivers on the current instance. After every call
+    the sampling probabilities move towards the operator with the best
+    estimate, while every operator keeps at least `min_probability` so that
+    estimates can recover when the landscape changes. Sampling starts from
+    the static Tweaks.WEIGHTS.
+    """
+
+    def __init__(self, weights=None, learning_rate=0.2, pursuit_rate=0.1, min_probability=0.02):
+        weights = Tweaks.WEIGHTS if weights is None else weights
+        self.names = list(weights)
+        self.proposers = Tweaks.get_named_move_proposers()
+        total = sum(weights.values())
+        self.probabilities = [weights[name] / total for name in self.names]
+        self.quality = [0.0] * len(self.names)
+        self.calls = [0] * len(self.names)
+        self.gains = [0] * len(self.names)
+        self.cpu_time = [0.0] * len(self.names)
+        self.learning_rate = learning_rate
+        self.pursuit_rate = pursuit_rate
+        self.min_probability = min(min_probability, 1.0 / len(self.names))
+        self.max_probability = 1.0 - (len(self.names) - 1) * self.min_probability
+
+    def choose(self):
+        """Sample an operator index."""
+        return random.choices(range(len(self.names)), weights=self.probabilities, k=1)[0]
+
+    def propose(self, index, solution, data):
+        return self.proposers[self.names[index]](solution, data)
+
+    def update(self, index, gain, cpu_seconds):
+        """Record that operator `index` improved fitness by `gain` in `cpu_seconds`."""
+        self.calls[index] += 1
+        self.gains[index] += gain
+        self.cpu_time[index] += cpu_seconds
+
+        reward = gain / max(cpu_seconds, 1e-6)
+        self.quality[index] += self.learning_rate * (reward - self.quality[index])
+
+        # No operator has paid off yet: keep the current distribution
+        best = max(range(len(self.names)), key=self.quality.__getitem__)
+        if self.quality[best] <= 0:
+            return
+        for k in range(len(self.names)):
+            target = self.max_probability if k == best else self.min_probability
+            self.probabilities[k] += self.pursuit_rate * (target - self.probabilities[k])
+
+    def weights(self):
+        """Current sampling probability of every operator, by name."""
+        return dict(zip(self.names, self.probabilities))
+
+    def summary(self):
+        """Per-operator statistics for the run summary."""
+        return {
+            name: {
+                'weight': self.probabilities[k],
+                'calls': self.calls[k],
+                'gain': self.gains[k],
+                'cpu_seconds': self.cpu_time[k],
+                'gain_per_cpu_second': self.gains[k] / self.cpu_time[k] if self.cpu_time[k] else 0.0,
+            }
+            for k, name in enumerate(self.names)
+        }
@@ -0,0 +1,138 @@
+import heapq
+import random
+import weakref
+from array import array
+
+
+class OverlapIndex:
+    """
+    Sparse library-library overlap index built from data.book_libs.
+
+    For every library it keeps the `k` libraries it shares the most score
+    with, as a CSR over the libraries (neighbour_offsets, neighbour_ids,
+    shared_counts, shared_scores), best first. Books held by more than
+    `max_book_degree` libraries are left out to keep the build near-linear
+    on instances with very popular books.
+
+    complete[L] is 1 when the neighbour list of L is exact: L was not
+    truncated to `k` and none of its books were left out. Only complete
+    lists may be used to prove that two libraries do not interact. One
+    index is kept per instance (see of()).
+    """
+    TOP_K = 16
+    MAX_BOOK_DEGREE = 64
+
+    _instances = weakref.WeakKeyDictionary()
+
+    def __init__(self, data, k=TOP_K, max_book_degree=MAX_BOOK_DEGREE):
+        self.k = k
+        scores = data.scores
+        lib_offsets = data.lib_offsets
+        lib_books = data.lib_books
+        book_lib_offsets = data.book_lib_offsets
+        book_lib_ids = data.book_lib_ids
+
+        self.neighbour_offsets = array('i', [0])
+        self.neighbour_ids = array('i')
+        self.shared_counts = array('i')
+        self.shared_scores = array('q')
+        self.complete = bytearray(data.num_libs)
+
+        for lib_id in range(data.num_libs):
+            shared = {}
+            complete = True
+            for book_id in lib_books[lib_offsets[lib_id]:lib_offsets[lib_id + 1]]:
+                lo, hi = book_lib_offsets[book_id], book_lib_offsets[book_id + 1]
+                if hi - lo == 1:
+                    continue
+                if hi - lo > max_book_degree:
+                    complete = False
+                    continue
+                score = scores[book_id]
+                for other in book_lib_ids[lo:hi]:
+                    if other != lib_id:
+                        entry = shared.get(other)
+                        if entry is None:
+                            shared[other] = [1, score]
+                        else:
+                            entry[0] += 1
+                            entry[1] += score
+
+            if len(shared) > k:
+                complete = False
+                neighbours = heapq.nlargest(k, shared.items(), key=lambda item: (item[1][1], -item[0]))
+            else:
+                neighbours = sorted(shared.items(), key=lambda item: (-item[1][1], item[0]))
+            for other, (count, mass) in neighbours:
+                self.neighbour_ids.append(other)
+                self.shared_counts.append(count)
+                self.shared_scores.append(mass)
+            self.neighbour_offsets.append(len(self.neighbour_ids))
+            self.complete[lib_id] = complete
+
+        self._solution = None
+        self._key = None
+        self._positions = None
+
+    @staticmethod
+    def of(data):
+        """Return the overlap index of an instance, building it on first use."""
+        index = OverlapIndex._instances.get(data)
+        if index is None:
+            index = OverlapIndex(data)
+            OverlapIndex._instances[data] = index
+        return index
+
+    def neighbours(self, lib_id):
+        """Ids of the libraries sharing books with `lib_id`, most shared score first."""
+        return self.neighbour_ids[self.neighbour_offsets[lib_id]:self.neighbour_offsets[lib_id + 1]]
+
+    def overlap(self, lib_id, other):
+        """(shared book count, shared score) of two libraries, (0, 0) if not indexed."""
+        for i in range(self.neighbour_offsets[lib_id], self.neighbour_offsets[lib_id + 1]):
+            if self.neighbour_ids[i] == other:
+                return self.shared_counts[i], self.shared_scores[i]
+        return 0, 0
+
+    def interacts(self, lib_id, others):
+        """
+        Return False only if `lib_id` provably shares no book with any
+        library of the set `others`.
+        """
+        if not self.complete[lib_id]:
+            return True
+        return any(other in others for other in self.neighbours(lib_id))
+
+    def positions(self, solution):
+        """
+        Map from signed library to position, kept until another solution asks
+        or the solution is rebuilt in place (e.g. by a perturbation), which
+        changes its order hash.
+        """
+        hashes = solution.checkpoint_hash
+        key = (solution.fitness_score, len(solution.signed_libraries), hashes[-1] if hashes else None)
+        cached = self._solution() if self._solution is not None else None
+        if cached is not solution or key != self._key:
+            self._positions = {lib_id: pos for pos, lib_id in enumerate(solution.signed_libraries)}
+            self._solution = weakref.ref(solution)
+            self._key = key
+        return self._positions
+
+    def signed_neighbour(self, solution, pos):
+        """
+        Position of a random signed library overlapping the one at `pos`,
+        weighted by shared score, or None if no indexed neighbour is signed.
+        """
+        positions = self.positions(solution)
+        lib_id = solution.signed_libraries[pos]
+        lo, hi = self.neighbour_offsets[lib_id], self.neighbour_offsets[lib_id + 1]
+        candidates = []
+        weights = []
+        for i in range(lo, hi):
+            other = positions.get(self.neighbour_ids[i])
+            if other is not None:
+                candidates.append(other)
+                weights.append(self.shared_scores[i] or 1)
+        if not candidates:
+            return None
+        return random.choices(candidates, weights=weights, k=1)[0]
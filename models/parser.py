@@ -1,12 +1,40 @@
-from .library import Library
+from array import array
 from .instance_data import InstanceData
+from .instance_cache import InstanceCache
 import sys
 
 class Parser:
-    def __init__(self, file_path):
+    def __init__(self, file_path, use_cache=True):
         self.file_path = file_path
-        
+        self.use_cache = use_cache
+        # Path of an up-to-date binary image of the instance after parse(),
+        # or None when caching is disabled or the cache could not be written
+        self.cache_path = None
+
     def parse(self):
+        """
+        Parse the instance, reusing the binary cache next to the input when
+        its content hash and format version match, and writing it otherwise.
+        """
+        if not self.use_cache:
+            return self.parse_text()
+
+        try:
+            digest = InstanceCache.content_hash(self.file_path)
+        except OSError:
+            # Let the text parser report missing or unreadable inputs
+            return self.parse_text()
+
+        cache_path = InstanceCache.cache_path(self.file_path)
+        data = InstanceCache.load(cache_path, digest)
+        if data is None:
+            data = self.parse_text()
+            if not InstanceCache.save(data, cache_path, digest):
+                return data
+        self.cache_path = cache_path
+        return data
+
+    def parse_text(self):
         try:
             with open(self.file_path, 'r') as file:
                 try:
@@ -37,7 +65,10 @@ class Parser:
                     except ValueError:
                         raise ValueError("Book scores must be integers")
 
-                    libs = []
+                    signup_days_per_lib = array('i')
+                    books_per_day_per_lib = array('i')
+                    lib_offsets = array('i', [0])
+                    lib_books = array('i')
                     for i in range(num_libs):
                         lib_header = file.readline().strip()
                         if not lib_header:
@@ -67,10 +98,17 @@ class Parser:
                         except ValueError:
                             raise ValueError(f"Book IDs for library {i} must be integers")
                         
-                        library = Library(books_count, signup_days, books_per_day, books, scores)
-                        libs.append(library)
+                        # Store the books of each library sorted by score (descending)
+                        books.sort(key=scores.__getitem__, reverse=True)
+                        signup_days_per_lib.append(signup_days)
+                        books_per_day_per_lib.append(books_per_day)
+                        lib_books.extend(books)
+                        lib_offsets.append(len(lib_books))
 
-                    return InstanceData(num_books, num_libs, num_days, scores, libs)
+                    return InstanceData.from_arrays(
+                        num_books, num_libs, num_days, array('i', scores),
+                        signup_days_per_lib, books_per_day_per_lib, lib_offsets, lib_books
+                    )
                 
                 except ValueError as e:
                     print(f"Error parsing file: {str(e)}")
@@ -0,0 +1,233 @@
+import random
+from bisect import bisect_right
+from operator import neg
+
+from models.fitness_cache import FitnessCache
+from models.overlap_index import OverlapIndex
+from models.scanned_books import ScannedBooks
+
+
+class RebuildEngine:
+    """
+    Rebuilds a solution from its signed library order, resuming from the
+    first modified position instead of re-simulating from day 0.
+
+    Every rebuilt solution carries per-position checkpoints:
+        checkpoint_times[i]  - signup day at which position i starts
+        checkpoint_scores[i] - fitness accumulated by positions before i
+        checkpoint_slack[i]  - smallest scheduling slack seen before i
+        checkpoint_hash[i]   - OrderHash of the first i signed libraries,
+                               salted past a book-level move (see BookChainMove)
+                               and again past a rebuild that keeps its books
+    The scanned-book state before position i is recovered by copying the
+    scanned-book bitmap and unscanning the books of positions >= i, so it is
+    not stored per position.
+
+    Past the resume point, a library keeps its book selection from the base
+    solution without recomputing it when it starts on the same day as in
+    the base, sits at most REUSE_SHIFT positions from its base position,
+    and its (complete) OverlapIndex neighbours neither changed side
+    relative to it nor changed their own selection.
+    """
+
+    # Tweaks need at least two scanning days left after signup and drop
+    # libraries that cannot be signed; the solver needs one day and keeps them.
+    TWEAK_MARGIN = 1
+    SOLVER_MARGIN = 0
+
+    REUSE_SHIFT = 8
+
+    @staticmethod
+    def rebuild(solution, data, base=None, start=0, margin=TWEAK_MARGIN, drop_skipped=True):
+        """
+        Rebuild solution.signed_libraries in place.
+
+        Args:
+            solution: The solution whose signed order should be rebuilt
+            data: The problem data
+            base: Solution whose checkpoints are reused; its first `start`
+                signed libraries must equal those of `solution`
+            start: First position that differs from `base`
+            margin: Scanning days that must remain after signup
+            drop_skipped: Move libraries that cannot be signed to the
+                unsigned list instead of keeping them in the signed order
+
+        Returns:
+            The rebuilt solution
+        """
+        order = solution.signed_libraries
+        hasher = FitnessCache.of(data).hasher
+        start, new_scanned_books, _, _ = RebuildEngine.prefix_state(
+            base, data, min(start, len(order)), margin, drop_skipped
+        )
+
+        if start:
+            new_scanned_books_per_library = base.scanned_books_per_library.copy()
+            for lib_id in base.signed_libraries[start:]:
+                new_scanned_books_per_library.pop(lib_id, None)
+            times = base.checkpoint_times[:start + 1]
+            fitness = base.checkpoint_scores[:start + 1]
+            slack = base.checkpoint_slack[:start + 1]
+            if base.checkpoint_hash is not None:
+                hashes = base.checkpoint_hash[:start + 1]
+            else:
+                hashes = hasher.prefix_hashes(order[:start])
+        else:
+            new_scanned_books_per_library = {}
+            times = [0]
+            fitness = [0]
+            slack = [data.num_days]
+            hashes = [0]
+
+        curr_time = times[-1]
+        curr_fitness = fitness[-1]
+        min_slack = slack[-1]
+        scores = data.scores
+        last_day = data.num_days - margin
+        new_signed_libraries = order[:start]
+
+        # Selections after a book-level move are not greedy, so they cannot be reused
+        reuse = (base is not None and base.checkpoint_rule == (margin, drop_skipped)
+                 and base.reassigned_from is None)
+        if reuse:
+            overlap = OverlapIndex.of(data)
+            base_order = base.signed_libraries
+            base_pos = {lib_id: pos for pos, lib_id in enumerate(base_order[start:], start)}
+            base_books = base.scanned_books_per_library
+            # Libraries among the first idx of only one of the two orders, and
+            # libraries whose selection differs from the base
+            moved = set()
+            changed = set()
+
+        for idx in range(start, len(order)):
+            lib_id = order[idx]
+            library = data.libs[lib_id]
+            available_books = None
+
+            # Check if there's enough time for signup and the scanning margin
+            if curr_time + library.signup_days < last_day:
+                pos = base_pos.get(lib_id) if reuse else None
+                if (pos is not None and abs(pos - idx) <= RebuildEngine.REUSE_SHIFT
+                        and base.checkpoint_times[pos] == curr_time and overlap.complete[lib_id]):
+                    # In the base, the library was preceded by base_order[:pos]
+                    shift = set(base_order[pos:idx] if pos < idx else base_order[idx:pos])
+                    if any((n in moved) != (n in shift) or n in changed for n in overlap.neighbours(lib_id)):
+                        pos = None
+                else:
+                    pos = None
+                if pos is not None:
+                    available_books = base_books.get(lib_id)
+                else:
+                    time_left = data.num_days - (curr_time + library.signup_days)
+                    max_books_scanned = time_left * library.books_per_day
+
+                    available_books = new_scanned_books.first_unscanned(library.book_ids, max_books_scanned)
+                    if reuse and available_books != base_books.get(lib_id, []):
+                        changed.add(lib_id)
+            elif reuse and base_books.get(lib_id):
+                changed.add(lib_id)
+
+            if reuse:
+                moved.symmetric_difference_update((lib_id,))
+                if idx < len(base_order):
+                    moved.symmetric_difference_update((base_order[idx],))
+
+            if available_books:
+                new_scanned_books_per_library[lib_id] = available_books
+                new_scanned_books.update(available_books)
+                min_slack = min(min_slack, data.num_days - 1 - (curr_time + library.signup_days))
+                curr_time += library.signup_days
+                curr_fitness += sum(map(scores.__getitem__, available_books))
+            elif drop_skipped:
+                solution.unsigned_libraries.append(lib_id)
+                continue
+            else:
+                min_slack = -1
+
+            hashes.append(hasher.extend(hashes[-1], lib_id, len(new_signed_libraries)))
+            new_signed_libraries.append(lib_id)
+            times.append(curr_time)
+            fitness.append(curr_fitness)
+            slack.append(min_slack)
+
+        reassigned = start and base.reassigned_from is not None and base.reassigned_from < start
+        if reassigned:
+            # The suffix is greedy again behind reassigned books, so the same
+            # order past `start` no longer scores as in the base: salt it anew
+            salt = random.getrandbits(61)
+            hashes[start + 1:] = [(h + salt) % hasher.MODULUS for h in hashes[start + 1:]]
+
+        solution.signed_libraries = new_signed_libraries
+        solution.scanned_books_per_library = new_scanned_books_per_library
+        solution.scanned_books = new_scanned_books
+        solution.fitness_score = curr_fitness
+        solution.checkpoint_times = times
+        solution.checkpoint_scores = fitness
+        solution.checkpoint_slack = slack
+        solution.checkpoint_hash = hashes
+        solution.checkpoint_rule = (margin, drop_skipped)
+        solution.reassigned_from = base.reassigned_from if reassigned else None
+        return solution
+
+    @staticmethod
+    def prefix_state(base, data, start, margin=TWEAK_MARGIN, drop_skipped=True):
+        """
+        Recover the state in which position `start` of `base` is scheduled.
+
+        Returns:
+            (start, scanned_books, curr_time, fitness) where start may be lowered
+            to the last position whose checkpoint is valid under the rule
+        """
+        start = RebuildEngine.resume_index(base, start, margin, drop_skipped)
+        if not start:
+            return 0, ScannedBooks(size=data.num_books), 0, 0
+
+        # Copying the bitmap is a memcpy, so always unscan the suffix
+        scanned_books = base.scanned_books.copy()
+        scanned_books.reserve(data.num_books)
+        per_lib = base.scanned_books_per_library
+        for lib_id in base.signed_libraries[start:]:
+            scanned_books.difference_update(per_lib.get(lib_id, ()))
+        return start, scanned_books, base.checkpoint_times[start], base.checkpoint_scores[start]
+
+    @staticmethod
+    def score_suffix(order, data, start, scanned_books, curr_time, fitness, margin=TWEAK_MARGIN):
+        """
+        Return the fitness of `order` given the state before position `start`,
+        as produced by prefix_state. Only the fitness is computed; no solution
+        is built. `scanned_books` is consumed.
+        """
+        scores = data.scores
+        libs = data.libs
+        num_days = data.num_days
+        last_day = num_days - margin
+
+        for lib_id in order[start:]:
+            library = libs[lib_id]
+            signup_end = curr_time + library.signup_days
+            if signup_end >= last_day:
+                continue
+            available_books = scanned_books.first_unscanned(
+                library.book_ids, (num_days - signup_end) * library.books_per_day
+            )
+            if available_books:
+                scanned_books.update(available_books)
+                curr_time = signup_end
+                fitness += sum(map(scores.__getitem__, available_books))
+        return fitness
+
+    @staticmethod
+    def resume_index(base, start, margin, drop_skipped):
+        """
+        Return the largest position <= start from which a rebuild under the
+        given rule may resume using the checkpoints of `base`.
+        """
+        if not start or base is None or base.checkpoint_times is None:
+            return 0
+        start = min(start, len(base.signed_libraries))
+        if base.checkpoint_rule == (margin, drop_skipped):
+            return start
+        # A prefix built under another rule is reusable as long as every
+        # library in it was signed with at least `margin` days to spare.
+        valid = bisect_right(base.checkpoint_slack, -margin, hi=start + 1, key=neg) - 1
+        return max(0, min(start, valid))
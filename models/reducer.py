@@ -0,0 +1,139 @@
+from array import array
+from collections import namedtuple
+
+from .instance_data import InstanceData
+
+# Original ids of the libraries and books of a reduced instance, by reduced id
+IdMap = namedtuple('IdMap', ['libs', 'books'])
+
+
+class InstanceReducer:
+    """
+    Shrinks an instance before solving by dropping what cannot affect the
+    score, and renumbers the rest compactly.
+
+    Always removed (provably safe):
+        - libraries with signup_days >= num_days, which can never be signed
+        - books with score 0, which only use up scanning capacity
+        - books held by no remaining library
+        - libraries left without books
+    Optionally removed (remove_dominated=True):
+        - libraries whose books are a subset of another library's that signs
+          up no slower and ships at least as many books per day. This is not
+          provably safe: with parallel scanning both libraries can be worth
+          signing, so it is a heuristic and off by default.
+
+    The reduced instance keeps the relative order of libraries and books, so
+    the score order of each library's books is unchanged. Its `id_map` maps
+    reduced ids back to the original ones; Solver stamps it on the solutions
+    it returns and Solution.export writes original ids.
+    """
+
+    @staticmethod
+    def reduce(data, remove_dominated=False):
+        """
+        Return the reduced instance, or `data` itself when nothing can be
+        removed.
+        """
+        scores = data.scores
+        offsets = data.lib_offsets
+        lib_books = data.lib_books
+
+        keep_lib = bytearray(data.num_libs)
+        for lib_id in range(data.num_libs):
+            if data.lib_signup_days[lib_id] >= data.num_days:
+                continue
+            lo, hi = offsets[lib_id], offsets[lib_id + 1]
+            # Books are sorted by score, so a library with any scoring book has one first
+            if hi > lo and scores[lib_books[lo]] > 0:
+                keep_lib[lib_id] = 1
+
+        if remove_dominated:
+            InstanceReducer._drop_dominated(data, keep_lib)
+
+        keep_book = bytearray(data.num_books)
+        for lib_id in range(data.num_libs):
+            if keep_lib[lib_id]:
+                for book_id in lib_books[offsets[lib_id]:offsets[lib_id + 1]]:
+                    if scores[book_id] > 0:
+                        keep_book[book_id] = 1
+
+        lib_ids = array('i', (i for i in range(data.num_libs) if keep_lib[i]))
+        book_ids = array('i', (i for i in range(data.num_books) if keep_book[i]))
+        if len(lib_ids) == data.num_libs and len(book_ids) == data.num_books:
+            return data
+        return InstanceReducer._remap(data, lib_ids, book_ids, keep_book)
+
+    @staticmethod
+    def restrict(data, lib_ids):
+        """
+        Return the sub-instance made of the libraries `lib_ids` (original ids,
+        increasing) and their books, renumbered compactly, with an id_map
+        back to the ids of `data`.
+        """
+        offsets = data.lib_offsets
+        keep_book = bytearray(data.num_books)
+        for lib_id in lib_ids:
+            for book_id in data.lib_books[offsets[lib_id]:offsets[lib_id + 1]]:
+                keep_book[book_id] = 1
+        book_ids = array('i', (i for i in range(data.num_books) if keep_book[i]))
+        return InstanceReducer._remap(data, array('i', lib_ids), book_ids, keep_book)
+
+    @staticmethod
+    def _remap(data, lib_ids, book_ids, keep_book):
+        """Build the instance of the kept libraries and books, renumbered in order."""
+        scores = data.scores
+        offsets = data.lib_offsets
+        lib_books = data.lib_books
+
+        new_book_id = array('i', bytes(4 * data.num_books))
+        for new_id, book_id in enumerate(book_ids):
+            new_book_id[book_id] = new_id
+
+        new_offsets = array('i', [0])
+        new_books = array('i')
+        for lib_id in lib_ids:
+            new_books.extend(
+                new_book_id[book_id] for book_id in lib_books[offsets[lib_id]:offsets[lib_id + 1]]
+                if keep_book[book_id]
+            )
+            new_offsets.append(len(new_books))
+
+        reduced = InstanceData.from_arrays(
+            len(book_ids), len(lib_ids), data.num_days,
+            array('i', (scores[book_id] for book_id in book_ids)),
+            array('i', (data.lib_signup_days[lib_id] for lib_id in lib_ids)),
+            array('i', (data.lib_books_per_day[lib_id] for lib_id in lib_ids)),
+            new_offsets, new_books
+        )
+        reduced.id_map = IdMap(lib_ids, book_ids)
+        return reduced
+
+    @staticmethod
+    def _drop_dominated(data, keep_lib):
+        """Clear keep_lib for libraries dominated by another kept library."""
+        offsets = data.lib_offsets
+        lib_books = data.lib_books
+        signup_days = data.lib_signup_days
+        books_per_day = data.lib_books_per_day
+
+        for lib_id in range(data.num_libs):
+            if not keep_lib[lib_id]:
+                continue
+            books = lib_books[offsets[lib_id]:offsets[lib_id + 1]]
+            book_set = set(books)
+            # Any dominating library holds the first book as well
+            for other in data.book_libs[books[0]]:
+                if other == lib_id or not keep_lib[other]:
+                    continue
+                if signup_days[other] > signup_days[lib_id] or books_per_day[other] < books_per_day[lib_id]:
+                    continue
+                other_books = lib_books[offsets[other]:offsets[other + 1]]
+                if len(other_books) < len(book_set) or not book_set.issubset(other_books):
+                    continue
+                # Of two identical libraries keep the lower id
+                if (len(other_books) == len(book_set) and signup_days[other] == signup_days[lib_id]
+                        and books_per_day[other] == books_per_day[lib_id] and other > lib_id):
+                    continue
+                keep_lib[lib_id] = 0
+                break
@@ -0,0 +1,111 @@
+from collections import deque
+from collections.abc import MutableSet
+from itertools import compress, filterfalse, islice, repeat
+
+
+class ScannedBooks(MutableSet):
+    """
+    Set of scanned book ids stored as a dense bytearray flag per book.
+
+    Copying is a single memcpy and membership is an index lookup. The usual
+    set API (in, iteration, add/remove/update, set algebra with plain sets)
+    is kept so that code written against `set` keeps working; set algebra
+    returns plain sets.
+    """
+    __slots__ = ('flags',)
+
+    def __init__(self, books=(), size=0):
+        self.flags = bytearray(size)
+        if books:
+            self.update(books)
+
+    @classmethod
+    def _from_iterable(cls, it):
+        return set(it)
+
+    def __contains__(self, book_id):
+        try:
+            return self.flags[book_id] == 1
+        except (IndexError, TypeError):
+            return False
+
+    def __iter__(self):
+        return compress(range(len(self.flags)), self.flags)
+
+    def __len__(self):
+        return self.flags.count(1)
+
+    def __repr__(self):
+        return f"ScannedBooks({sorted(self)})"
+
+    def reserve(self, size):
+        """Make room for book ids below `size`."""
+        if size > len(self.flags):
+            self.flags.extend(bytes(size - len(self.flags)))
+
+    def add(self, book_id):
+        if book_id >= len(self.flags):
+            self.reserve(book_id + 1)
+        self.flags[book_id] = 1
+
+    def discard(self, book_id):
+        if book_id < len(self.flags):
+            self.flags[book_id] = 0
+
+    def remove(self, book_id):
+        if book_id not in self:
+            raise KeyError(book_id)
+        self.flags[book_id] = 0
+
+    def update(self, books):
+        if not isinstance(books, (list, tuple, range, memoryview)):
+            books = list(books)
+        if not books:
+            return
+        self.reserve(max(books) + 1)
+        deque(map(self.flags.__setitem__, books, repeat(1)), maxlen=0)
+
+    def difference_update(self, books):
+        flags = self.flags
+        try:
+            deque(map(flags.__setitem__, books, repeat(0)), maxlen=0)
+        except IndexError:
+            size = len(flags)
+            for book_id in books:
+                if book_id < size:
+                    flags[book_id] = 0
+
+    def clear(self):
+        self.flags = bytearray(len(self.flags))
+
+    def copy(self):
+        new = ScannedBooks.__new__(ScannedBooks)
+        new.flags = bytearray(self.flags)
+        return new
+
+    def first_unscanned(self, book_ids, limit):
+        """
+        Return the first `limit` books of `book_ids` that are not scanned,
+        in the given order. With a library's score-sorted book ids these are
+        the books the library would scan next.
+
+        This is the book-selection step shared by the constructors and the
+        rebuilds: the walk stops after `limit` hits, so its cost is linear in
+        the books examined rather than a sort of the library's unscanned books.
+        """
+        if limit <= 0:
+            return []
+        flags = self.flags
+        try:
+            if limit >= len(book_ids):
+                return [b for b in book_ids if not flags[b]]
+            return list(islice(filterfalse(flags.__getitem__, book_ids), limit))
+        except IndexError:
+            # Some ids lie beyond the bitmap, so they cannot have been scanned
+            size = len(flags)
+            unscanned = (b for b in book_ids if b >= size or not flags[b])
+            return list(islice(unscanned, limit))
+
+    def total_score(self, scores):
+        """Sum of the scores of all scanned books."""
+        return sum(compress(scores, self.flags))
@@ -1,21 +1,43 @@
+from models.scanned_books import ScannedBooks
+
+
 class Solution:
     signed_libraries = []
     unsigned_libraries = []
     scanned_books_per_library = {}
     scanned_books = set()
     fitness_score = -1
+    checkpoint_times = None
+    checkpoint_scores = None
+    checkpoint_slack = None
+    checkpoint_hash = None
+    checkpoint_rule = None
+    # First position whose books were reassigned by a book-level move, so
+    # that it and the positions after it no longer follow the greedy rule
+    reassigned_from = None
+    # IdMap of the reduced instance the solution was built on, if any
+    id_map = None
 
     def __init__(self, signed_libs, unsigned_libs, scanned_books_per_library, scanned_books):
         self.signed_libraries = signed_libs
         self.unsigned_libraries = unsigned_libs
         self.scanned_books_per_library = scanned_books_per_library
+        if not isinstance(scanned_books, ScannedBooks):
+            scanned_books = ScannedBooks(scanned_books)
         self.scanned_books = scanned_books
 
     def export(self, file_path):
+        """Write the solution in the submission format, using original ids."""
+        lib_ids = book_ids = None
+        if self.id_map is not None:
+            lib_ids, book_ids = self.id_map
         with open(file_path, "w+") as ofp:
             ofp.write(f"{len(self.signed_libraries)}\n")
             for library in self.signed_libraries:
                 books = self.scanned_books_per_library.get(library, [])
+                if lib_ids is not None:
+                    library = lib_ids[library]
+                    books = [book_ids[book] for book in books]
                 ofp.write(f"{library} {len(books)}\n")
                 ofp.write(" ".join(map(str, books)) + "\n")
 
@@ -31,10 +53,7 @@ class Solution:
             lofp.write("\nOverall scanned books: " + ", ".join(map(str, sorted(self.scanned_books))) + "\n")
 
     def calculate_fitness_score(self, scores):
-        score = 0
-        for book in self.scanned_books:
-            score += scores[book]
-        self.fitness_score = score
+        self.fitness_score = self.scanned_books.total_score(scores)
 
     def calculate_delta_fitness(self, data, new_book_id, removed_book_id=None):
         """
@@ -59,9 +78,21 @@ class Solution:
         self.fitness_score = updated_fitness
 
     def clone(self):
-        return Solution(
+        solution = Solution(
             self.signed_libraries.copy(),
             self.unsigned_libraries.copy(),
             {k: v.copy() for k, v in self.scanned_books_per_library.items()},
             self.scanned_books.copy()
         )
+        solution.fitness_score = self.fitness_score
+        solution.copy_checkpoints(self)
+        return solution
+
+    def copy_checkpoints(self, other):
+        """Share the rebuild checkpoints of a solution with the same signed order."""
+        self.checkpoint_times = other.checkpoint_times
+        self.checkpoint_scores = other.checkpoint_scores
+        self.checkpoint_slack = other.checkpoint_slack
+        self.checkpoint_hash = other.checkpoint_hash
+        self.checkpoint_rule = other.checkpoint_rule
+        self.reassigned_from = other.reassigned_from
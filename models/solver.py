@@ -1,18 +1,81 @@
+import heapq
+import os
 import random
 import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from models.solution import Solution
+from models.book_assignment import BookAssignment
+from models.candidate_list import CandidateList
 from models.initial_solution import InitialSolution
 from models.local_search import LocalSearch
+from models.large_neighbourhood_search import LargeNeighbourhoodSearch
+from models.rebuild_engine import RebuildEngine
+from models.deadline import Deadline
+from models.fitness_cache import FitnessCache
+from models.move_bound import MoveBound
+from models.operator_selector import AdaptiveOperatorSelector
+from models.overlap_index import OverlapIndex
+from models.reducer import InstanceReducer
+from models.scanned_books import ScannedBooks
 
 class Solver:
-    def iterated_local_search(self, data, time_limit=300, max_iterations=1000, pool_size=5):
+    # Share of the time limit given to construction when no initial solution is passed
+    CONSTRUCTION_SHARE = 0.25
+    # Share of the time limit given to the component sub-solves of component_search
+    COMPONENT_SHARE = 0.7
+    # Components with fewer libraries are not solved on their own
+    MIN_COMPONENT_LIBS = 20
+    # Share of the search budget kept for re-assigning the books of the final solution
+    ASSIGNMENT_SHARE = 0.05
+    # Search modes accepted by solve()
+    MODES = ('ils', 'parallel', 'components', 'lns')
+
+    def solve(self, data, mode='ils', time_limit=300, max_iterations=1000, num_workers=None):
+        """
+        Run one of the search modes on an instance.
+        Args:
+            data: The problem data
+            mode: 'ils' for iterated_local_search, 'parallel' for
+                parallel_iterated_local_search, 'components' for
+                component_search, 'lns' for large_neighbourhood_search
+            time_limit: Wall-clock budget in seconds
+            max_iterations: ILS iteration budget (of each walker); the
+                destroy-repair iterations of 'lns' are only bounded by time
+            num_workers: Number of processes of the parallel modes
+                (default: one per core)
+        Returns:
+            The best solution found
+        """
+        if mode == 'ils':
+            return self.iterated_local_search(data, time_limit=time_limit, max_iterations=max_iterations)
+        if mode == 'parallel':
+            return self.parallel_iterated_local_search(data, time_limit=time_limit, max_iterations=max_iterations,
+                                                       num_workers=num_workers)
+        if mode == 'components':
+            return self.component_search(data, time_limit=time_limit, max_iterations=max_iterations,
+                                         num_workers=num_workers)
+        if mode == 'lns':
+            return self.large_neighbourhood_search(data, time_limit=time_limit)
+        raise ValueError(f"Unknown search mode {mode!r}, expected one of {', '.join(Solver.MODES)}")
+
+    def iterated_local_search(self, data, time_limit=300, max_iterations=1000, pool_size=5, initial_solution=None,
+                              deadline=None, construction_share=None, selector=None, optimize_assignment=True):
         """
         Perform Iterated Local Search (ILS) on the given problem data with enhanced acceptance and home base selection.
         Args:
             data: The problem data (libraries, scores, num_days, etc.)
-            time_limit: Maximum time to run the algorithm in seconds
+            time_limit: Wall-clock budget in seconds, covering construction and search
             max_iterations: Maximum number of iterations to perform
             pool_size: Number of recent local optima to keep in the homebase pool
+            initial_solution: Solution to start from instead of constructing one
+            deadline: Global Deadline of the run; the search also stops there
+            construction_share: Share of the budget given to construction
+                (default: CONSTRUCTION_SHARE)
+            selector: AdaptiveOperatorSelector shared by every local search
+                of the run; a new one is created if omitted
+            optimize_assignment: Re-assign the books of the best solution with
+                BookAssignment at the end, in ASSIGNMENT_SHARE of the budget
         Returns:
             The best solution found during the search
         """
@@ -31,7 +94,20 @@ class Solver:
         else:
             max_local_search_time = 1.0  # Default local search time
         
-        current_solution = InitialSolution.generate_initial_solution(data)
+        deadline = Deadline.of(deadline, time_limit)
+        if selector is None:
+            selector = AdaptiveOperatorSelector()
+        if initial_solution is not None:
+            current_solution = initial_solution
+        else:
+            if construction_share is None:
+                construction_share = self.CONSTRUCTION_SHARE
+            current_solution = InitialSolution.generate_initial_solution(
+                data, deadline=deadline.sub(construction_share)
+            )
+        final_deadline = deadline
+        if optimize_assignment:
+            deadline = deadline.sub(1 - self.ASSIGNMENT_SHARE)
         start_time = time.time()
         best_solution = current_solution
         homebase_pool = []
@@ -45,8 +121,8 @@ class Solver:
         # print(f"Best initial solution fitness: {current_solution.fitness_score}")
 
         iteration = 0
-        while time.time() - start_time < time_limit and iteration < max_iterations:
-            remaining_time = time_limit - (time.time() - start_time)
+        while not deadline.expired() and iteration < max_iterations:
+            remaining_time = deadline.remaining()
             progress = iteration / max_iterations
             
             # Adjust local search time based on instance size and progress
@@ -81,7 +157,8 @@ class Solver:
                 data, 
                 strategy=perturbation_strategy,
                 stagnation_level=stagnation_counter/max_stagnation,
-                is_small_instance=is_small_instance
+                is_small_instance=is_small_instance,
+                deadline=deadline
             )
             
             # if perturbed_solution.fitness_score > best_solution.fitness_score:
@@ -97,7 +174,9 @@ class Solver:
                 perturbed_solution, 
                 data, 
                 time_limit=local_search_time,
-                max_iterations=max_iterations_ls
+                max_iterations=max_iterations_ls,
+                deadline=deadline,
+                selector=selector
             )
 
             accept = False
@@ -154,18 +233,363 @@ class Solver:
                     current_solution,
                     data,
                     time_limit=extra_time,
-                    max_iterations=2500
+                    max_iterations=2500,
+                    deadline=deadline,
+                    selector=selector
                 )
                 if current_solution.fitness_score > best_solution.fitness_score:
                     best_solution = current_solution
                     # print(f"New best solution found during extra local search: {best_solution.fitness_score}")
 
-        total_time = time.time() - start_time
+        search_fitness = best_solution.fitness_score
+        if optimize_assignment:
+            best_solution = BookAssignment.optimize(best_solution, data, deadline=final_deadline)
+
+        self.fitness_cache_stats = FitnessCache.of(data).stats()
+        self.operator_weights = selector.weights()
+        self._summarise(start_time, total_iterations, best_solution, search_fitness,
+                        fitness_cache=self.fitness_cache_stats,
+                        move_bound=MoveBound.of(data).stats(),
+                        operators=selector.summary())
         # print(f"\nILS finished after {total_iterations} iterations and {total_time:.2f} seconds.")
         # print(f"Final best score: {best_solution.fitness_score}")
+        best_solution.id_map = data.id_map
         return best_solution
         
-    def perturb_solution(self, solution, data, strategy='remove_insert', stagnation_level=0.0, is_small_instance=False):
+    def parallel_iterated_local_search(self, data, time_limit=300, max_iterations=1000, pool_size=5,
+                                       num_workers=None, sync_interval=10.0, initial_solution=None,
+                                       deadline=None, construction_share=None):
+        """
+        Run independent ILS walkers on one instance in a process pool.
+
+        The walkers share the global best through shared memory. Each walker
+        runs ILS in epochs of `sync_interval` seconds; after an epoch it
+        publishes its best if that beats the shared incumbent, or restarts
+        from the incumbent if that is better. Each walker keeps its own
+        homebase pool. The books of the overall best are re-assigned by
+        BookAssignment in the last ASSIGNMENT_SHARE of the budget.
+        Args:
+            data: The problem data
+            time_limit: Wall-clock budget in seconds, covering construction and search
+            max_iterations: ILS iteration budget of each walker
+            pool_size: Homebase pool size of each walker
+            num_workers: Number of walkers (default: one per core)
+            sync_interval: Seconds between synchronisations with the incumbent
+            initial_solution: Solution to start from instead of constructing one
+            deadline: Global Deadline of the run
+            construction_share: Share of the budget given to construction
+        Returns:
+            The best solution found by any walker
+        """
+        num_workers = num_workers or os.cpu_count() or 1
+        if num_workers <= 1:
+            return self.iterated_local_search(data, time_limit, max_iterations, pool_size, initial_solution,
+                                              deadline, construction_share)
+
+        deadline = Deadline.of(deadline, time_limit)
+        if initial_solution is None:
+            if construction_share is None:
+                construction_share = self.CONSTRUCTION_SHARE
+            initial_solution = InitialSolution.generate_initial_solution_parallel(
+                data, deadline=deadline.sub(construction_share), num_workers=num_workers
+            )
+        final_deadline = deadline
+        deadline = deadline.sub(1 - self.ASSIGNMENT_SHARE)
+        start_time = time.time()
+
+        context = multiprocessing.get_context()
+        best_fitness = context.Value('q', initial_solution.fitness_score)
+        best_order = context.Array('i', len(data.libs) + 1, lock=False)
+        Solver._store_order(best_order, initial_solution.signed_libraries)
+
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=context,
+            initializer=Solver._init_walker,
+            initargs=(data, best_fitness, best_order)
+        ) as executor:
+            futures = [
+                executor.submit(Solver._run_walker, random.getrandbits(64), deadline.end,
+                                max_iterations, pool_size, sync_interval)
+                for _ in range(num_workers)
+            ]
+            results = [future.result() for future in futures]
+
+        best_solution = max([initial_solution] + [solution for solution, _ in results],
+                            key=lambda s: s.fitness_score)
+        search_fitness = best_solution.fitness_score
+        best_solution = BookAssignment.optimize(best_solution, data, deadline=final_deadline)
+        self._summarise(start_time, sum(iterations for _, iterations in results), best_solution, search_fitness,
+                        walkers=num_workers)
+        best_solution.id_map = data.id_map
+        return best_solution
+
+    def component_search(self, data, time_limit=300, max_iterations=1000, pool_size=5, num_workers=None,
+                         min_component_size=None, deadline=None, component_share=None):
+        """
+        Solve the connected components of the instance separately, then merge
+        their orders under the shared day budget.
+
+        Components with at least `min_component_size` libraries are solved by
+        ILS as sub-instances with the full day budget, in a process pool;
+        each gets a share of the component phase proportional to its size.
+        The smaller components are solved together as one more sub-instance.
+        The component orders are then merged greedily by score per signup
+        day, and the merged solution is polished by local search on the
+        whole instance and by BookAssignment for the rest of the budget.
+        Falls back to
+        iterated_local_search when one component holds nearly every library,
+        and returns an empty solution when the instance has no library.
+        Args:
+            data: The problem data
+            time_limit: Wall-clock budget in seconds
+            max_iterations: ILS iteration budget of each sub-solve
+            pool_size: Homebase pool size of each sub-solve
+            num_workers: Number of processes (default: one per core)
+            min_component_size: Smallest component solved on its own
+                (default: MIN_COMPONENT_LIBS)
+            deadline: Global Deadline of the run
+            component_share: Share of the budget given to the sub-solves
+                (default: COMPONENT_SHARE)
+        Returns:
+            The best solution found
+        """
+        deadline = Deadline.of(deadline, time_limit)
+        start_time = time.time()
+        if min_component_size is None:
+            min_component_size = self.MIN_COMPONENT_LIBS
+        if component_share is None:
+            component_share = self.COMPONENT_SHARE
+
+        components = data.library_components()
+        if not components:
+            # Nothing to sign, e.g. when the reducer removed every library
+            best_solution = RebuildEngine.rebuild(Solution([], [], {}, set()), data)
+            self._summarise(start_time, 0, best_solution, best_solution.fitness_score,
+                            components=0, merged_fitness=best_solution.fitness_score)
+            best_solution.id_map = data.id_map
+            return best_solution
+        if len(components[0]) >= 0.9 * data.num_libs:
+            return self.iterated_local_search(data, time_limit, max_iterations, pool_size, deadline=deadline)
+
+        groups = [c for c in components if len(c) >= min_component_size]
+        rest = sorted(lib_id for c in components if len(c) < min_component_size for lib_id in c)
+        if rest:
+            groups.append(rest)
+
+        num_workers = min(num_workers or os.cpu_count() or 1, len(groups))
+        phase = deadline.remaining() * component_share
+        tasks = [
+            (InstanceReducer.restrict(data, group),
+             phase * min(1.0, num_workers * len(group) / data.num_libs),
+             max_iterations, pool_size, random.getrandbits(64))
+            for group in groups
+        ]
+
+        if num_workers <= 1:
+            results = [Solver._solve_component(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context()) as executor:
+                results = list(executor.map(Solver._solve_component, *zip(*tasks)))
+
+        merged = self._merge_orders(data, [order for order, _ in results])
+        search_deadline = deadline.sub(1 - self.ASSIGNMENT_SHARE)
+        best_solution = LocalSearch.local_search(merged, data, time_limit=search_deadline.remaining(),
+                                                 max_iterations=float('inf'), deadline=search_deadline)
+        if merged.fitness_score > best_solution.fitness_score:
+            best_solution = merged
+        search_fitness = best_solution.fitness_score
+        best_solution = BookAssignment.optimize(best_solution, data, deadline=deadline)
+        self._summarise(start_time, sum(iterations for _, iterations in results), best_solution, search_fitness,
+                        components=len(groups), merged_fitness=merged.fitness_score)
+        best_solution.id_map = data.id_map
+        return best_solution
+
+    def large_neighbourhood_search(self, data, time_limit=300, max_iterations=float('inf'), initial_solution=None,
+                                   deadline=None, construction_share=None):
+        """
+        Improve a constructed solution by destroy and repair (see
+        LargeNeighbourhoodSearch) instead of perturbation and local search.
+        The books of the best solution are re-assigned by BookAssignment in
+        the last ASSIGNMENT_SHARE of the budget.
+        Args:
+            data: The problem data
+            time_limit: Wall-clock budget in seconds, covering construction and search
+            max_iterations: Maximum number of destroy-repair iterations
+            initial_solution: Solution to start from instead of constructing one
+            deadline: Global Deadline of the run
+            construction_share: Share of the budget given to construction
+                (default: CONSTRUCTION_SHARE)
+        Returns:
+            The best solution found
+        """
+        deadline = Deadline.of(deadline, time_limit)
+        if initial_solution is None:
+            if construction_share is None:
+                construction_share = self.CONSTRUCTION_SHARE
+            initial_solution = InitialSolution.generate_initial_solution(
+                data, deadline=deadline.sub(construction_share)
+            )
+        start_time = time.time()
+
+        lns = LargeNeighbourhoodSearch()
+        best_solution = lns.search(initial_solution, data, deadline=deadline.sub(1 - self.ASSIGNMENT_SHARE),
+                                   max_iterations=max_iterations)
+        search_fitness = best_solution.fitness_score
+        best_solution = BookAssignment.optimize(best_solution, data, deadline=deadline)
+
+        self._summarise(start_time, lns.iterations, best_solution, search_fitness, lns=lns.summary())
+        best_solution.id_map = data.id_map
+        return best_solution
+
+    @staticmethod
+    def _solve_component(sub_data, time_limit, max_iterations, pool_size, seed):
+        """
+        Run ILS on a component sub-instance; returns its order in the parent's
+        ids and the number of ILS iterations.
+        """
+        random.seed(seed)
+        solver = Solver()
+        # Only the order is returned, so the books are not re-assigned
+        solution = solver.iterated_local_search(sub_data, time_limit, max_iterations, pool_size,
+                                                optimize_assignment=False)
+        return [sub_data.id_map.libs[lib_id] for lib_id in solution.signed_libraries], solver.iterations
+
+    def _merge_orders(self, data, orders):
+        """
+        Interleave the orders of independent components into one schedule.
+
+        Each order is consumed front to back. At every step the head with the
+        best score per signup day at the current day is signed. Components
+        share no books, so a head's score only drops as days pass: heads wait
+        in a lazy max-heap and are re-scored when they reach the top.
+        """
+        scanned_books = ScannedBooks(size=data.num_books)
+        heads = [0] * len(orders)
+        curr_time = 0
+        signed = []
+
+        def head_entry(c):
+            order = orders[c]
+            while heads[c] < len(order):
+                lib_id = order[heads[c]]
+                signup_end = curr_time + data.lib_signup_days[lib_id]
+                if signup_end < data.num_days:
+                    k = (data.num_days - signup_end) * data.lib_books_per_day[lib_id]
+                    score = data.top_score(lib_id, k, scanned_books)
+                    if score > 0:
+                        return (-score / max(1, data.lib_signup_days[lib_id]), c, curr_time)
+                # Libraries that no longer fit or add nothing never will
+                heads[c] += 1
+            return None
+
+        heap = [entry for entry in map(head_entry, range(len(orders))) if entry is not None]
+        heapq.heapify(heap)
+        while heap:
+            _, c, scored_at = heap[0]
+            if scored_at != curr_time:
+                entry = head_entry(c)
+                if entry is None:
+                    heapq.heappop(heap)
+                else:
+                    heapq.heapreplace(heap, entry)
+                continue
+
+            heapq.heappop(heap)
+            lib_id = orders[c][heads[c]]
+            signup_end = curr_time + data.lib_signup_days[lib_id]
+            k = (data.num_days - signup_end) * data.lib_books_per_day[lib_id]
+            scanned_books.update(scanned_books.first_unscanned(data.libs[lib_id].book_ids, k))
+            signed.append(lib_id)
+            curr_time = signup_end
+            heads[c] += 1
+            entry = head_entry(c)
+            if entry is not None:
+                heapq.heappush(heap, entry)
+
+        return self._solution_from_order(signed, data)
+
+    @staticmethod
+    def _store_order(shared_order, signed_libraries):
+        shared_order[0] = len(signed_libraries)
+        shared_order[1:len(signed_libraries) + 1] = signed_libraries
+
+    _walker_state = None
+
+    @staticmethod
+    def _init_walker(data, best_fitness, best_order):
+        Solver._walker_state = (data, best_fitness, best_order)
+
+    @staticmethod
+    def _run_walker(seed, deadline_end, max_iterations, pool_size, sync_interval):
+        """Body of one parallel ILS walker; returns its best solution and its ILS iterations."""
+        data, best_fitness, best_order = Solver._walker_state
+        deadline = Deadline(end=deadline_end)
+        random.seed(seed)
+        solver = Solver()
+
+        with best_fitness.get_lock():
+            signed = list(best_order[1:best_order[0] + 1])
+        current_solution = solver._solution_from_order(signed, data)
+        best_solution = current_solution
+        iterations_left = max_iterations
+        total_iterations = 0
+        # One selector per walker, so what it learns carries across epochs
+        selector = AdaptiveOperatorSelector()
+
+        while iterations_left > 0 and not deadline.expired():
+            current_solution = solver.iterated_local_search(
+                data, time_limit=sync_interval, max_iterations=iterations_left,
+                pool_size=pool_size, initial_solution=current_solution, deadline=deadline,
+                selector=selector, optimize_assignment=False
+            )
+            iterations_left -= max(1, solver.iterations)
+            total_iterations += solver.iterations
+            if current_solution.fitness_score > best_solution.fitness_score:
+                best_solution = current_solution
+
+            # Publish an improvement, or restart from a better incumbent
+            with best_fitness.get_lock():
+                if best_solution.fitness_score > best_fitness.value:
+                    best_fitness.value = best_solution.fitness_score
+                    Solver._store_order(best_order, best_solution.signed_libraries)
+                    signed = None
+                elif best_fitness.value > best_solution.fitness_score:
+                    signed = list(best_order[1:best_order[0] + 1])
+                else:
+                    signed = None
+            if signed is not None:
+                current_solution = solver._solution_from_order(signed, data)
+                best_solution = current_solution
+
+        return best_solution, total_iterations
+
+    def _summarise(self, start_time, iterations, best_solution, search_fitness, **details):
+        """
+        Record the statistics of a run in run_summary, so that every mode
+        replaces the summary of an earlier run on the same Solver.
+        """
+        self.iterations = iterations
+        self.run_summary = {
+            'iterations': iterations,
+            'seconds': time.time() - start_time,
+            'best_fitness': best_solution.fitness_score,
+            'assignment_gain': best_solution.fitness_score - search_fitness,
+            **details,
+        }
+
+    def _solution_from_order(self, signed_libraries, data):
+        signed = set(signed_libraries)
+        solution = Solution(
+            list(signed_libraries),
+            [lib.id for lib in data.libs if lib.id not in signed],
+            {},
+            set()
+        )
+        return self._rebuild_solution(solution, data)
+
+    def perturb_solution(self, solution, data, strategy='remove_insert', stagnation_level=0.0, is_small_instance=False,
+                         deadline=None):
         """
         Perturb the current solution using various strategies with adaptations for small instances.
         Args:
@@ -174,54 +598,47 @@ class Solver:
             strategy: The perturbation strategy to use
             stagnation_level: Level of stagnation (0.0-1.0)
             is_small_instance: Whether this is a small problem instance
+            deadline: Global Deadline of the run; once it has passed the
+                solution is returned unperturbed
         Returns:
             A new perturbed solution
         """
+        if deadline is not None and deadline.expired():
+            return solution
+
         new_solution = self._clone_solution(solution)
         
         if strategy == 'remove_insert':
-            return self._perturb_remove_insert(new_solution, data, stagnation_level, is_small_instance)
+            return self._perturb_remove_insert(new_solution, data, stagnation_level, is_small_instance, base=solution)
         elif strategy == 'reorder':
-            return self._perturb_reorder(new_solution, data, stagnation_level, is_small_instance)
+            return self._perturb_reorder(new_solution, data, stagnation_level, is_small_instance, base=solution)
         elif strategy == 'shuffle':
-            return self._perturb_shuffle(new_solution, data, stagnation_level, is_small_instance)
+            return self._perturb_shuffle(new_solution, data, stagnation_level, is_small_instance, base=solution)
         else:
-            return self._perturb_remove_insert(new_solution, data, stagnation_level, is_small_instance)
+            return self._perturb_remove_insert(new_solution, data, stagnation_level, is_small_instance, base=solution)
             
     def _clone_solution(self, solution):
-        return Solution(
+        new_solution = Solution(
             solution.signed_libraries.copy(),
             solution.unsigned_libraries.copy(),
             solution.scanned_books_per_library.copy(),
             solution.scanned_books.copy()
         )
+        new_solution.fitness_score = solution.fitness_score
+        new_solution.copy_checkpoints(solution)
+        return new_solution
     
-    def _calculate_library_efficiency(self, library, data, scanned_books):
+    def _library_efficiencies(self, lib_ids, data, scanned_books):
         """
-        Calculate library efficiency based on potential score, unique books, and signup cost.
+        Efficiency of each library based on potential score, unique books and
+        signup cost, from the incrementally kept residuals of CandidateList.
         """
-        # Get unscanned books
-        available_books = {book.id for book in library.books} - scanned_books
-        if not available_books:
-            return 0
-            
-        # Calculate score potential
-        score_potential = sum(data.scores[book_id] for book_id in available_books)
-        
-        # Calculate unique ratio
-        unique_ratio = len(available_books) / len(library.books)
-        
-        # Calculate time efficiency
-        time_efficiency = library.books_per_day / max(1, library.signup_days)
-        
-        # Combined score
-        efficiency = (score_potential * 0.6 + 
-                     unique_ratio * 0.2 + 
-                     time_efficiency * 0.2)
-                     
-        return efficiency
-        
-    def _perturb_remove_insert(self, solution, data, stagnation_level=0.0, is_small_instance=False):
+        return CandidateList.of(data).efficiencies(lib_ids, scanned_books)
+
+    def _perturb_remove_insert(self, solution, data, stagnation_level=0.0, is_small_instance=False, base=None):
+        if not solution.signed_libraries:
+            return solution
+
         # Adaptive perturbation size based on stagnation level
         base_size = len(solution.signed_libraries) // 10  # 10% of libraries
         
@@ -250,11 +667,11 @@ class Solver:
             # 2. Libraries that might perform better elsewhere
             
             # Calculate efficiency scores for signed libraries
-            library_scores = []
-            for i, lib_id in enumerate(solution.signed_libraries):
-                library = data.libs[lib_id]
-                efficiency = self._calculate_library_efficiency(library, data, solution.scanned_books)
-                library_scores.append((i, lib_id, efficiency))
+            efficiencies = self._library_efficiencies(solution.signed_libraries, data, solution.scanned_books)
+            library_scores = [
+                (i, lib_id, efficiency)
+                for i, (lib_id, efficiency) in enumerate(zip(solution.signed_libraries, efficiencies))
+            ]
             
             # Sort by efficiency (ascending so lowest scores come first)
             library_scores.sort(key=lambda x: x[2])
@@ -279,11 +696,8 @@ class Solver:
         # For small instances, use intelligent insertion 50% of the time
         if is_small_instance and random.random() < 0.5:
             # Calculate efficiency for unsigned libraries
-            library_scores = []
-            for lib_id in solution.unsigned_libraries:
-                library = data.libs[lib_id]
-                efficiency = self._calculate_library_efficiency(library, data, solution.scanned_books)
-                library_scores.append((lib_id, efficiency))
+            efficiencies = self._library_efficiencies(solution.unsigned_libraries, data, solution.scanned_books)
+            library_scores = list(zip(solution.unsigned_libraries, efficiencies))
             
             # Sort by efficiency (descending)
             library_scores.sort(key=lambda x: x[1], reverse=True)
@@ -309,9 +723,10 @@ class Solver:
                 insert_idx = min(idx, len(solution.signed_libraries))
                 solution.signed_libraries.insert(insert_idx, lib_id)
             
-        return self._rebuild_solution(solution, data)
+        first_modified = min(to_remove_indices, default=len(solution.signed_libraries))
+        return self._rebuild_solution(solution, data, base=base, start=first_modified)
         
-    def _perturb_reorder(self, solution, data, stagnation_level=0.0, is_small_instance=False):
+    def _perturb_reorder(self, solution, data, stagnation_level=0.0, is_small_instance=False, base=None):
         if len(solution.signed_libraries) < 2:
             return solution
             
@@ -334,17 +749,14 @@ class Solver:
             # For larger instances, use standard approach
             num_to_reorder = min(5, max(2, int(len(solution.signed_libraries) // 3 * (1 + stagnation_level / 2))))
         
-        indices = random.sample(range(len(solution.signed_libraries)), num_to_reorder)
+        indices = self._interacting_indices(solution, data, num_to_reorder)
         
         # For small instances, use intelligent reordering occasionally
         if is_small_instance and random.random() < 0.4:  # 40% chance for intelligent reordering
             # Calculate efficiency for each library to be reordered
-            library_scores = []
-            for i in indices:
-                lib_id = solution.signed_libraries[i]
-                library = data.libs[lib_id]
-                efficiency = self._calculate_library_efficiency(library, data, solution.scanned_books)
-                library_scores.append((i, lib_id, efficiency))
+            lib_ids = [solution.signed_libraries[i] for i in indices]
+            efficiencies = self._library_efficiencies(lib_ids, data, solution.scanned_books)
+            library_scores = list(zip(indices, lib_ids, efficiencies))
             
             # Sort by efficiency (descending)
             library_scores.sort(key=lambda x: x[2], reverse=True)
@@ -363,9 +775,26 @@ class Solver:
             for i, lib_id in zip(indices, libraries_to_reorder):
                 solution.signed_libraries[i] = lib_id
             
-        return self._rebuild_solution(solution, data)
+        return self._rebuild_solution(solution, data, base=base, start=min(indices, default=len(solution.signed_libraries)))
         
-    def _perturb_shuffle(self, solution, data, stagnation_level=0.0, is_small_instance=False):
+    def _interacting_indices(self, solution, data, count):
+        """
+        Sample `count` distinct signed positions, growing the sample through
+        the OverlapIndex so that the libraries share books where possible.
+        Falls back to random positions when no signed neighbour is left.
+        """
+        overlap = OverlapIndex.of(data)
+        indices = [random.randint(0, len(solution.signed_libraries) - 1)]
+        chosen = set(indices)
+        while len(indices) < count:
+            pos = overlap.signed_neighbour(solution, random.choice(indices))
+            if pos is None or pos in chosen:
+                pos = random.choice([i for i in range(len(solution.signed_libraries)) if i not in chosen])
+            indices.append(pos)
+            chosen.add(pos)
+        return indices
+
+    def _perturb_shuffle(self, solution, data, stagnation_level=0.0, is_small_instance=False, base=None):
         if len(solution.signed_libraries) < 2:
             return solution
             
@@ -396,11 +825,8 @@ class Solver:
             segment = solution.signed_libraries[start_idx:end_idx]
             
             # Calculate efficiency for each library in segment
-            library_scores = []
-            for lib_id in segment:
-                library = data.libs[lib_id]
-                efficiency = self._calculate_library_efficiency(library, data, solution.scanned_books)
-                library_scores.append((lib_id, efficiency))
+            efficiencies = self._library_efficiencies(segment, data, solution.scanned_books)
+            library_scores = list(zip(segment, efficiencies))
             
             # Sort by efficiency (descending)
             library_scores.sort(key=lambda x: x[1], reverse=True)
@@ -413,29 +839,10 @@ class Solver:
             random.shuffle(subsegment)
             solution.signed_libraries[start_idx:end_idx] = subsegment
         
-        return self._rebuild_solution(solution, data)
-        
-    def _rebuild_solution(self, solution, data):
-        curr_time = 0
-        new_scanned_books = set()
-        new_scanned_books_per_library = {}
+        return self._rebuild_solution(solution, data, base=base, start=start_idx)
         
-        for lib_id in solution.signed_libraries:
-            library = data.libs[lib_id]
-            if curr_time + library.signup_days >= data.num_days:
-                continue
-            time_left = data.num_days - (curr_time + library.signup_days)
-            max_books_scanned = time_left * library.books_per_day
-            available_books = sorted(
-                {book.id for book in library.books} - new_scanned_books,
-                key=lambda b: -data.scores[b]
-            )[:max_books_scanned]
-            if available_books:
-                new_scanned_books_per_library[lib_id] = available_books
-                new_scanned_books.update(available_books)
-                curr_time += library.signup_days
-                
-        solution.scanned_books_per_library = new_scanned_books_per_library
-        solution.scanned_books = new_scanned_books
-        solution.calculate_fitness_score(data.scores)
-        return solution
+    def _rebuild_solution(self, solution, data, base=None, start=0):
+        return RebuildEngine.rebuild(
+            solution, data, base=base, start=start,
+            margin=RebuildEngine.SOLVER_MARGIN, drop_skipped=False
+        )
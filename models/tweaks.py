@@ -1,6 +1,8 @@
 import random
-import copy
-from models.solution import Solution
+from models.batch_evaluator import BatchEvaluator
+from models.candidate_list import CandidateList
+from models.moves import BookChainMove, CrossoverMove, InsertMove, ReplaceMove, SwapMove
+from models.overlap_index import OverlapIndex
 
 class Tweaks:
     # Define weights for each tweak method
@@ -10,110 +12,70 @@ class Tweaks:
         'swap_same_books': 1.0,
         'swap_last_book': 1.0,
         'swap_neighbor_libraries': 1.0,
+        'swap_overlapping': 1.0,
         'insert_library': 2.0,
-        'crossover': 1.0
+        'crossover': 1.0,
+        'book_chain': 2.0,
+        'best_insert_library': 1.0,
+        'best_swap_signed_with_unsigned': 1.0
     }
 
-    @staticmethod
-    def get_tweak_methods():
-        """Return list of tweak methods with their weights"""
-        return [
-            (Tweaks.tweak_solution_swap_signed, Tweaks.WEIGHTS['swap_signed']),
-            (Tweaks.tweak_solution_swap_signed_with_unsigned, Tweaks.WEIGHTS['swap_signed_with_unsigned']),
-            (Tweaks.tweak_solution_swap_same_books, Tweaks.WEIGHTS['swap_same_books']),
-            (Tweaks.tweak_solution_swap_neighbor_libraries, Tweaks.WEIGHTS['swap_neighbor_libraries']),
-            (Tweaks.tweak_solution_insert_library, Tweaks.WEIGHTS['insert_library']),
-            (Tweaks.tweak_solution_crossover, Tweaks.WEIGHTS['crossover']),
-            (Tweaks.tweak_solution_swap_last_book, Tweaks.WEIGHTS['swap_last_book'])
-        ]
+    # Longest chain of book hand-overs tried by propose_book_chain
+    MAX_CHAIN = 4
+    # Most moves scored in one batch by the best-improvement proposers
+    BATCH_SIZE = 16
 
     @staticmethod
-    def choose_tweak_method():
-        """Randomly choose a tweak method based on weights"""
-        methods, weights = zip(*Tweaks.get_tweak_methods())
-        return random.choices(methods, weights=weights, k=1)[0]
+    def get_named_move_proposers():
+        """Return the move proposers keyed by their WEIGHTS name; every other view derives from it"""
+        return {
+            'swap_signed': Tweaks.propose_swap_signed,
+            'swap_signed_with_unsigned': Tweaks.propose_swap_signed_with_unsigned,
+            'swap_same_books': Tweaks.propose_swap_same_books,
+            'swap_last_book': Tweaks.propose_swap_last_book,
+            'swap_neighbor_libraries': Tweaks.propose_swap_neighbor_libraries,
+            'swap_overlapping': Tweaks.propose_swap_overlapping,
+            'insert_library': Tweaks.propose_insert_library,
+            'crossover': Tweaks.propose_crossover,
+            'book_chain': Tweaks.propose_book_chain,
+            'best_insert_library': Tweaks.propose_best_insert_library,
+            'best_swap_signed_with_unsigned': Tweaks.propose_best_swap_signed_with_unsigned
+        }
 
     @staticmethod
-    def tweak_solution_swap_signed(solution, data):
-        """
-        Randomly swaps two libraries within the signed libraries list.
-        This creates a new solution by exchanging the positions of two libraries
-        while maintaining the feasibility of the solution.
+    def get_move_proposers():
+        """Return list of move proposers with their weights"""
+        return [(proposer, Tweaks.WEIGHTS[name]) for name, proposer in Tweaks.get_named_move_proposers().items()]
 
-        Args:
-            solution: The current solution to tweak
-            data: The problem data
+    @staticmethod
+    def get_tweak_methods():
+        """Return list of tweak methods, which commit the proposed move, with their weights"""
+        return [(Tweaks.tweak_method(proposer), weight) for proposer, weight in Tweaks.get_move_proposers()]
 
-        Returns:
-            A new solution with two libraries swapped
-        """
-        if len(solution.signed_libraries) < 2:
-            return solution
-
-        # Create a copy of the solution
-        new_solution = Solution(
-            solution.signed_libraries.copy(),
-            solution.unsigned_libraries.copy(),
-            solution.scanned_books_per_library.copy(),
-            solution.scanned_books.copy()
-        )
-
-        # Select two random libraries to swap
-        idx1, idx2 = random.sample(range(len(new_solution.signed_libraries)), 2)
-        new_solution.signed_libraries[idx1], new_solution.signed_libraries[idx2] = \
-            new_solution.signed_libraries[idx2], new_solution.signed_libraries[idx1]
-
-        # Rebuild the solution
-        curr_time = 0
-        new_scanned_books = set()
-        new_scanned_books_per_library = {}
-        new_signed_libraries = []
-
-        for lib_id in new_solution.signed_libraries:
-            library = data.libs[lib_id]
-            
-            # Check if there's enough time for signup and at least one day of scanning
-            if curr_time + library.signup_days >= data.num_days - 1:
-                new_solution.unsigned_libraries.append(lib_id)
-                continue
-
-            time_left = data.num_days - (curr_time + library.signup_days)
-            max_books_scanned = time_left * library.books_per_day
-
-            available_books = sorted(
-                {book.id for book in library.books} - new_scanned_books,
-                key=lambda b: -data.scores[b]
-            )[:max_books_scanned]
-
-            if available_books:
-                new_signed_libraries.append(lib_id)
-                new_scanned_books_per_library[lib_id] = available_books
-                new_scanned_books.update(available_books)
-                curr_time += library.signup_days
-            else:
-                new_solution.unsigned_libraries.append(lib_id)
+    @staticmethod
+    def tweak_method(proposer):
+        """Tweak method that commits the move `proposer` proposes, if any."""
+        return lambda solution, data: Tweaks._commit(proposer(solution, data), solution, data)
 
-        new_solution.signed_libraries = new_signed_libraries
-        new_solution.scanned_books_per_library = new_scanned_books_per_library
-        new_solution.scanned_books = new_scanned_books
-        new_solution.calculate_fitness_score(data.scores)
+    @staticmethod
+    def _commit(move, solution, data):
+        return move.commit(solution, data) if move is not None else solution
 
-        return new_solution
+    @staticmethod
+    def propose_swap_signed(solution, data):
+        """Propose swapping two random libraries of the signed order."""
+        if len(solution.signed_libraries) < 2:
+            return None
+        idx1, idx2 = random.sample(range(len(solution.signed_libraries)), 2)
+        return SwapMove(idx1, idx2)
 
     @staticmethod
-    def tweak_solution_swap_signed_with_unsigned(solution, data, bias_type=None, bias_ratio=2/3):
+    def propose_swap_signed_with_unsigned(solution, data, bias_type=None, bias_ratio=2/3):
+        """Propose exchanging a signed library with an unsigned one."""
         if not solution.signed_libraries or not solution.unsigned_libraries:
-            return solution
+            return None
 
-        # Create a copy of the solution
-        new_solution = Solution(
-            solution.signed_libraries.copy(),
-            solution.unsigned_libraries.copy(),
-            solution.scanned_books_per_library.copy(),
-            solution.scanned_books.copy()
-        )
-
-        total_signed = len(new_solution.signed_libraries)
+        total_signed = len(solution.signed_libraries)
 
         # Select signed library based on bias
         if bias_type == "favor_first_half":
@@ -129,180 +91,234 @@ class Tweaks:
         else:
             signed_idx = random.randint(0, total_signed - 1)
 
-        # Select unsigned library
-        unsigned_idx = random.randint(0, len(new_solution.unsigned_libraries) - 1)
-
-        # Swap libraries
-        signed_lib_id = new_solution.signed_libraries[signed_idx]
-        unsigned_lib_id = new_solution.unsigned_libraries[unsigned_idx]
-        new_solution.signed_libraries[signed_idx] = unsigned_lib_id
-        new_solution.unsigned_libraries[unsigned_idx] = signed_lib_id
-
-        # Rebuild the solution
-        curr_time = 0
-        new_scanned_books = set()
-        new_scanned_books_per_library = {}
-        new_signed_libraries = []
-
-        for lib_id in new_solution.signed_libraries:
-            library = data.libs[lib_id]
-            
-            # Check if there's enough time for signup and at least one day of scanning
-            if curr_time + library.signup_days >= data.num_days - 1:
-                new_solution.unsigned_libraries.append(lib_id)
-                continue
-
-            time_left = data.num_days - (curr_time + library.signup_days)
-            max_books_scanned = time_left * library.books_per_day
-
-            available_books = sorted(
-                {book.id for book in library.books} - new_scanned_books,
-                key=lambda b: -data.scores[b]
-            )[:max_books_scanned]
-
-            if available_books:
-                new_signed_libraries.append(lib_id)
-                new_scanned_books_per_library[lib_id] = available_books
-                new_scanned_books.update(available_books)
-                curr_time += library.signup_days
-            else:
-                new_solution.unsigned_libraries.append(lib_id)
+        # Select an unsigned library among the most promising ones
+        unsigned_idx = CandidateList.of(data).sample(solution)
+        return ReplaceMove(signed_idx, unsigned_idx)
 
-        new_solution.signed_libraries = new_signed_libraries
-        new_solution.scanned_books_per_library = new_scanned_books_per_library
-        new_solution.scanned_books = new_scanned_books
-        new_solution.calculate_fitness_score(data.scores)
+    @staticmethod
+    def propose_swap_same_books(solution, data):
+        """Propose swapping two distinct random positions of the signed order."""
+        if len(solution.signed_libraries) < 2:
+            return None
 
-        return new_solution
+        idx1 = random.randint(0, len(solution.signed_libraries) - 1)
+        idx2 = random.randint(0, len(solution.signed_libraries) - 1)
+        while idx1 == idx2:
+            idx2 = random.randint(0, len(solution.signed_libraries) - 1)
+        return SwapMove(idx1, idx2)
 
     @staticmethod
-    def tweak_solution_swap_same_books(solution, data):
+    def _spare_capacity(solution, data, lib_id, pos):
+        """Books the signed library at `pos` could still scan."""
+        time_left = data.num_days - solution.checkpoint_times[pos + 1]
+        return time_left * data.lib_books_per_day[lib_id] - len(solution.scanned_books_per_library.get(lib_id, ()))
+
+    @staticmethod
+    def _book_move_state(solution, data):
+        """
+        Pick a random signed library with scanned books and its best unscanned
+        book. Returns (pos, lib_id, book_id), or None if there is none or the
+        solution has no checkpoints to read capacities from.
+        """
+        signed = solution.signed_libraries
+        times = solution.checkpoint_times
+        if not signed or times is None or len(times) != len(signed) + 1:
+            return None
+        pos = random.randint(0, len(signed) - 1)
+        lib_id = signed[pos]
+        if not solution.scanned_books_per_library.get(lib_id):
+            return None
+        gained = solution.scanned_books.first_unscanned(data.libs[lib_id].book_ids, 1)
+        if not gained:
+            return None
+        return pos, lib_id, gained[0]
+
+    @staticmethod
+    def propose_swap_last_book(solution, data):
+        """
+        Propose replacing the last scanned book of a random library with its
+        best unscanned book, or just adding that book if the library has
+        capacity left.
+        """
+        state = Tweaks._book_move_state(solution, data)
+        if state is None:
+            return None
+        pos, lib_id, gained = state
+        scores = data.scores
+        if Tweaks._spare_capacity(solution, data, lib_id, pos) > 0:
+            return BookChainMove(pos, lib_id, gained, delta=scores[gained])
+        last = solution.scanned_books_per_library[lib_id][-1]
+        return BookChainMove(pos, lib_id, gained, dropped=(lib_id, last), delta=scores[gained] - scores[last])
+
+    @staticmethod
+    def propose_book_chain(solution, data, attempts=4, max_chain=None):
+        """
+        Propose an ejection chain of book hand-overs that makes room for the
+        best unscanned book of a random signed library.
+
+        The library takes the book; if it is full it hands one of its books
+        to another signed library that holds it and scans books (found via
+        data.book_libs), which in turn hands one of its own books on if it is
+        full, for up to `max_chain` links. The chain ends at a library with
+        spare capacity, or the last library drops its lowest book. Libraries
+        appear at most once, and `attempts` random books are tried at each
+        link.
+        """
+        state = Tweaks._book_move_state(solution, data)
+        if state is None:
+            return None
+        pos, gainer, gained = state
+        if max_chain is None:
+            max_chain = Tweaks.MAX_CHAIN
+        scores = data.scores
+        per_lib = solution.scanned_books_per_library
+        if Tweaks._spare_capacity(solution, data, gainer, pos) > 0:
+            return BookChainMove(pos, gainer, gained, delta=scores[gained])
+
+        positions = OverlapIndex.of(data).positions(solution)
+        links = []
+        start = pos
+        visited = {gainer}
+        giver = gainer
+        received = None
+        for _ in range(max_chain):
+            books = per_lib[giver]
+            link = None
+            for _ in range(attempts):
+                book = random.choice(books)
+                # Libraries kept in the order without scanning never signed up
+                receivers = [lib_id for lib_id in data.book_libs[book]
+                             if lib_id not in visited and lib_id in positions and per_lib.get(lib_id)]
+                if receivers:
+                    link = book, random.choice(receivers)
+                    break
+            if link is None:
+                break
+            book, receiver = link
+            receiver_pos = positions[receiver]
+            links.append((giver, receiver, book))
+            visited.add(receiver)
+            start = min(start, receiver_pos)
+            if Tweaks._spare_capacity(solution, data, receiver, receiver_pos) > 0:
+                return BookChainMove(start, gainer, gained, links, delta=scores[gained])
+            giver = receiver
+            received = book
+
+        # The last library of the chain is full: it drops its lowest book
+        lowest = per_lib[giver][-1]
+        if received is not None and scores[received] < scores[lowest]:
+            lowest = received
+        return BookChainMove(start, gainer, gained, links, (giver, lowest), scores[gained] - scores[lowest])
+
+    @staticmethod
+    def propose_crossover(solution, data):
+        """Propose splitting the signed order at a random crossover point."""
         if len(solution.signed_libraries) < 2:
-            return solution
-
-        # Create a copy of the solution
-        new_solution = Solution(
-            solution.signed_libraries.copy(),
-            solution.unsigned_libraries.copy(),
-            solution.scanned_books_per_library.copy(),
-            solution.scanned_books.copy()
-        )
-
-        # Select two random libraries to swap
-        idx1 = random.randint(0, len(new_solution.signed_libraries) - 1)
-        idx2 = random.randint(0, len(new_solution.signed_libraries) - 1)
-        while idx1 == idx2:
-            idx2 = random.randint(0, len(new_solution.signed_libraries) - 1)
-
-        # Swap the libraries
-        new_solution.signed_libraries[idx1], new_solution.signed_libraries[idx2] = \
-            new_solution.signed_libraries[idx2], new_solution.signed_libraries[idx1]
-
-        # Rebuild the solution
-        curr_time = 0
-        new_scanned_books = set()
-        new_scanned_books_per_library = {}
-        new_signed_libraries = []
-
-        for lib_id in new_solution.signed_libraries:
-            library = data.libs[lib_id]
-            
-            # Check if there's enough time for signup and at least one day of scanning
-            if curr_time + library.signup_days >= data.num_days - 1:
-                new_solution.unsigned_libraries.append(lib_id)
-                continue
-
-            time_left = data.num_days - (curr_time + library.signup_days)
-            max_books_scanned = time_left * library.books_per_day
-
-            available_books = sorted(
-                {book.id for book in library.books} - new_scanned_books,
-                key=lambda b: -data.scores[b]
-            )[:max_books_scanned]
-
-            if available_books:
-                new_signed_libraries.append(lib_id)
-                new_scanned_books_per_library[lib_id] = available_books
-                new_scanned_books.update(available_books)
-                curr_time += library.signup_days
-            else:
-                new_solution.unsigned_libraries.append(lib_id)
+            return None
+        return CrossoverMove(random.randint(1, len(solution.signed_libraries) - 1))
+
+    @staticmethod
+    def propose_swap_neighbor_libraries(solution, data):
+        """Propose swapping a random library with its successor."""
+        if len(solution.signed_libraries) < 2:
+            return None
+        pos = random.randint(0, len(solution.signed_libraries) - 2)
+        return SwapMove(pos, pos + 1)
+
+    @staticmethod
+    def propose_swap_overlapping(solution, data, attempts=4):
+        """
+        Propose swapping a random library with a signed library it shares
+        books with, picked by shared score. Returns None if no sampled
+        library has a signed neighbour in the OverlapIndex.
+        """
+        if len(solution.signed_libraries) < 2:
+            return None
+        overlap = OverlapIndex.of(data)
+        for _ in range(attempts):
+            pos = random.randint(0, len(solution.signed_libraries) - 1)
+            other = overlap.signed_neighbour(solution, pos)
+            if other is not None:
+                return SwapMove(pos, other)
+        return None
 
-        new_solution.signed_libraries = new_signed_libraries
-        new_solution.scanned_books_per_library = new_scanned_books_per_library
-        new_solution.scanned_books = new_scanned_books
-        new_solution.calculate_fitness_score(data.scores)
+    @staticmethod
+    def propose_insert_library(solution, data):
+        """Propose inserting a promising unsigned library at a random position."""
+        if not solution.unsigned_libraries:
+            return None
+        unsigned_idx = CandidateList.of(data).sample(solution)
+        insert_pos = random.randint(0, len(solution.signed_libraries))
+        return InsertMove(unsigned_idx, insert_pos)
 
-        return new_solution
+    @staticmethod
+    def propose_best_insert_library(solution, data, batch_size=None):
+        """
+        Best-improvement variant of propose_insert_library: a promising
+        unsigned library is scored at up to `batch_size` random positions in
+        one batch by BatchEvaluator, and its best insert is proposed. The
+        batch fills the FitnessCache, so evaluating the proposal is free.
+        """
+        if not solution.unsigned_libraries:
+            return None
+        if batch_size is None:
+            batch_size = Tweaks.BATCH_SIZE
+        unsigned_idx = CandidateList.of(data).sample(solution)
+        positions = range(len(solution.signed_libraries) + 1)
+        if batch_size < len(positions):
+            positions = random.sample(positions, batch_size)
+        moves = [InsertMove(unsigned_idx, pos) for pos in positions]
+        return BatchEvaluator.best(solution, data, moves)[0]
 
     @staticmethod
-    def tweak_solution_swap_last_book(solution, data):
-        if not solution.signed_libraries:
-            return solution
-
-        new_solution = Solution(
-            solution.signed_libraries.copy(),
-            solution.unsigned_libraries.copy(),
-            solution.scanned_books_per_library.copy(),
-            solution.scanned_books.copy()
-        )
-
-        lib_id = random.choice(new_solution.signed_libraries)
-        library = data.libs[lib_id]
-        scanned_books = new_solution.scanned_books_per_library.get(lib_id, [])
-
-        if not scanned_books:
-            return new_solution
-
-        last_book = scanned_books[-1]
-        available_books = sorted(
-            {book.id for book in library.books} - new_solution.scanned_books,
-            key=lambda b: -data.scores[b]
-        )
-
-        if not available_books:
-            return new_solution
-
-        new_book = available_books[0]
-        new_scanned_books = scanned_books[:-1] + [new_book]
-        new_solution.scanned_books_per_library[lib_id] = new_scanned_books
-        new_solution.scanned_books.remove(last_book)
-        new_solution.scanned_books.add(new_book)
-
-        curr_time = 0
-        new_scanned_books = set()
-        new_scanned_books_per_library = {}
-        new_signed_libraries = []
-
-        for lib_id in new_solution.signed_libraries:
-            library = data.libs[lib_id]
-            
-            if curr_time + library.signup_days >= data.num_days - 1:
-                new_solution.unsigned_libraries.append(lib_id)
-                continue
-
-            time_left = data.num_days - (curr_time + library.signup_days)
-            max_books_scanned = time_left * library.books_per_day
-
-            available_books = sorted(
-                {book.id for book in library.books} - new_scanned_books,
-                key=lambda b: -data.scores[b]
-            )[:max_books_scanned]
-
-            if available_books:
-                new_signed_libraries.append(lib_id)
-                new_scanned_books_per_library[lib_id] = available_books
-                new_scanned_books.update(available_books)
-                curr_time += library.signup_days
-            else:
-                new_solution.unsigned_libraries.append(lib_id)
+    def propose_best_swap_signed_with_unsigned(solution, data, batch_size=None):
+        """
+        Best-improvement variant of propose_swap_signed_with_unsigned: a
+        random signed library is scored against up to `batch_size` of the
+        most promising unsigned libraries in one batch, which share the whole
+        prefix before the slot, and the best exchange is proposed.
+        """
+        if not solution.signed_libraries or not solution.unsigned_libraries:
+            return None
+        if batch_size is None:
+            batch_size = Tweaks.BATCH_SIZE
+        signed_idx = random.randint(0, len(solution.signed_libraries) - 1)
+        unsigned_indices = CandidateList.of(data).top(solution)[:batch_size]
+        moves = [ReplaceMove(signed_idx, unsigned_idx) for unsigned_idx in unsigned_indices]
+        return BatchEvaluator.best(solution, data, moves)[0]
 
-        new_solution.signed_libraries = new_signed_libraries
-        new_solution.scanned_books_per_library = new_scanned_books_per_library
-        new_solution.scanned_books = new_scanned_books
-        new_solution.calculate_fitness_score(data.scores)
+    @staticmethod
+    def tweak_solution_swap_signed(solution, data):
+        """
+        Randomly swaps two libraries within the signed libraries list.
+        This creates a new solution by exchanging the positions of two libraries
+        while maintaining the feasibility of the solution.
 
-        return new_solution
+        Args:
+            solution: The current solution to tweak
+            data: The problem data
+
+        Returns:
+            A new solution with two libraries swapped
+        """
+        return Tweaks._commit(Tweaks.propose_swap_signed(solution, data), solution, data)
+
+    @staticmethod
+    def tweak_solution_swap_signed_with_unsigned(solution, data, bias_type=None, bias_ratio=2/3):
+        move = Tweaks.propose_swap_signed_with_unsigned(solution, data, bias_type, bias_ratio)
+        return Tweaks._commit(move, solution, data)
+
+    @staticmethod
+    def tweak_solution_swap_same_books(solution, data):
+        return Tweaks._commit(Tweaks.propose_swap_same_books(solution, data), solution, data)
+
+    @staticmethod
+    def tweak_solution_swap_last_book(solution, data):
+        return Tweaks._commit(Tweaks.propose_swap_last_book(solution, data), solution, data)
+
+    @staticmethod
+    def tweak_solution_book_chain(solution, data):
+        return Tweaks._commit(Tweaks.propose_book_chain(solution, data), solution, data)
 
     @staticmethod
     def tweak_solution_crossover(solution, data):
@@ -312,210 +328,16 @@ class Tweaks:
         2. Creating two new solutions by combining parts of the original solution
         3. Selecting the better of the two solutions
         """
-        if len(solution.signed_libraries) < 2:
-            return solution
-
-        # Select a random crossover point
-        crossover_point = random.randint(1, len(solution.signed_libraries) - 1)
-        
-        # Create two new solutions
-        solution1 = Solution(
-            solution.signed_libraries[:crossover_point],
-            solution.unsigned_libraries + solution.signed_libraries[crossover_point:],
-            {},
-            set()
-        )
-        
-        solution2 = Solution(
-            solution.signed_libraries[crossover_point:],
-            solution.unsigned_libraries + solution.signed_libraries[:crossover_point],
-            {},
-            set()
-        )
-        
-        # Rebuild both solutions
-        curr_time = 0
-        new_scanned_books = set()
-        new_scanned_books_per_library = {}
-        new_signed_libraries = []
-        
-        # Process solution1
-        for lib_id in solution1.signed_libraries:
-            library = data.libs[lib_id]
-            
-            # Check if there's enough time for signup and at least one day of scanning
-            if curr_time + library.signup_days >= data.num_days - 1:
-                solution1.unsigned_libraries.append(lib_id)
-                continue
-                
-            time_left = data.num_days - (curr_time + library.signup_days)
-            max_books_scanned = time_left * library.books_per_day
-            
-            available_books = sorted(
-                {book.id for book in library.books} - new_scanned_books,
-                key=lambda b: -data.scores[b]
-            )[:max_books_scanned]
-            
-            if available_books:
-                new_signed_libraries.append(lib_id)
-                new_scanned_books_per_library[lib_id] = available_books
-                new_scanned_books.update(available_books)
-                curr_time += library.signup_days
-            else:
-                solution1.unsigned_libraries.append(lib_id)
-        
-        solution1.signed_libraries = new_signed_libraries
-        solution1.scanned_books_per_library = new_scanned_books_per_library
-        solution1.scanned_books = new_scanned_books
-        solution1.calculate_fitness_score(data.scores)
-        
-        # Process solution2
-        curr_time = 0
-        new_scanned_books = set()
-        new_scanned_books_per_library = {}
-        new_signed_libraries = []
-        
-        for lib_id in solution2.signed_libraries:
-            library = data.libs[lib_id]
-            
-            # Check if there's enough time for signup and at least one day of scanning
-            if curr_time + library.signup_days >= data.num_days - 1:
-                solution2.unsigned_libraries.append(lib_id)
-                continue
-                
-            time_left = data.num_days - (curr_time + library.signup_days)
-            max_books_scanned = time_left * library.books_per_day
-            
-            available_books = sorted(
-                {book.id for book in library.books} - new_scanned_books,
-                key=lambda b: -data.scores[b]
-            )[:max_books_scanned]
-            
-            if available_books:
-                new_signed_libraries.append(lib_id)
-                new_scanned_books_per_library[lib_id] = available_books
-                new_scanned_books.update(available_books)
-                curr_time += library.signup_days
-            else:
-                solution2.unsigned_libraries.append(lib_id)
-        
-        solution2.signed_libraries = new_signed_libraries
-        solution2.scanned_books_per_library = new_scanned_books_per_library
-        solution2.scanned_books = new_scanned_books
-        solution2.calculate_fitness_score(data.scores)
-        
-        # Return the better solution
-        return solution1 if solution1.fitness_score > solution2.fitness_score else solution2
+        return Tweaks._commit(Tweaks.propose_crossover(solution, data), solution, data)
 
     @staticmethod
     def tweak_solution_swap_neighbor_libraries(solution, data):
-        if len(solution.signed_libraries) < 2:
-            return solution
-
-        # Create a copy of the solution
-        new_solution = Solution(
-            solution.signed_libraries.copy(),
-            solution.unsigned_libraries.copy(),
-            solution.scanned_books_per_library.copy(),
-            solution.scanned_books.copy()
-        )
-
-        # Select a random position and its neighbor
-        pos = random.randint(0, len(new_solution.signed_libraries) - 2)
-        new_solution.signed_libraries[pos], new_solution.signed_libraries[pos + 1] = \
-            new_solution.signed_libraries[pos + 1], new_solution.signed_libraries[pos]
-
-        # Rebuild the solution
-        curr_time = 0
-        new_scanned_books = set()
-        new_scanned_books_per_library = {}
-        new_signed_libraries = []
-
-        for lib_id in new_solution.signed_libraries:
-            library = data.libs[lib_id]
-            
-            # Check if there's enough time for signup and at least one day of scanning
-            if curr_time + library.signup_days >= data.num_days - 1:
-                new_solution.unsigned_libraries.append(lib_id)
-                continue
-
-            time_left = data.num_days - (curr_time + library.signup_days)
-            max_books_scanned = time_left * library.books_per_day
-
-            available_books = sorted(
-                {book.id for book in library.books} - new_scanned_books,
-                key=lambda b: -data.scores[b]
-            )[:max_books_scanned]
-
-            if available_books:
-                new_signed_libraries.append(lib_id)
-                new_scanned_books_per_library[lib_id] = available_books
-                new_scanned_books.update(available_books)
-                curr_time += library.signup_days
-            else:
-                new_solution.unsigned_libraries.append(lib_id)
+        return Tweaks._commit(Tweaks.propose_swap_neighbor_libraries(solution, data), solution, data)
 
-        new_solution.signed_libraries = new_signed_libraries
-        new_solution.scanned_books_per_library = new_scanned_books_per_library
-        new_solution.scanned_books = new_scanned_books
-        new_solution.calculate_fitness_score(data.scores)
-
-        return new_solution
+    @staticmethod
+    def tweak_solution_swap_overlapping(solution, data):
+        return Tweaks._commit(Tweaks.propose_swap_overlapping(solution, data), solution, data)
 
     @staticmethod
     def tweak_solution_insert_library(solution, data):
-        if not solution.unsigned_libraries:
-            return solution
-
-        # Create a copy of the solution
-        new_solution = Solution(
-            solution.signed_libraries.copy(),
-            solution.unsigned_libraries.copy(),
-            solution.scanned_books_per_library.copy(),
-            solution.scanned_books.copy()
-        )
-
-        # Select a random unsigned library
-        unsigned_idx = random.randint(0, len(new_solution.unsigned_libraries) - 1)
-        new_lib_id = new_solution.unsigned_libraries.pop(unsigned_idx)
-
-        # Select a random position to insert
-        insert_pos = random.randint(0, len(new_solution.signed_libraries))
-        new_solution.signed_libraries.insert(insert_pos, new_lib_id)
-
-        # Rebuild the solution
-        curr_time = 0
-        new_scanned_books = set()
-        new_scanned_books_per_library = {}
-        new_signed_libraries = []
-
-        for lib_id in new_solution.signed_libraries:
-            library = data.libs[lib_id]
-            
-            # Check if there's enough time for signup and at least one day of scanning
-            if curr_time + library.signup_days >= data.num_days - 1:
-                new_solution.unsigned_libraries.append(lib_id)
-                continue
-
-            time_left = data.num_days - (curr_time + library.signup_days)
-            max_books_scanned = time_left * library.books_per_day
-
-            available_books = sorted(
-                {book.id for book in library.books} - new_scanned_books,
-                key=lambda b: -data.scores[b]
-            )[:max_books_scanned]
-
-            if available_books:
-                new_signed_libraries.append(lib_id)
-                new_scanned_books_per_library[lib_id] = available_books
-                new_scanned_books.update(available_books)
-                curr_time += library.signup_days
-            else:
-                new_solution.unsigned_libraries.append(lib_id)
-
-        new_solution.signed_libraries = new_signed_libraries
-        new_solution.scanned_books_per_library = new_scanned_books_per_library
-        new_solution.scanned_books = new_scanned_books
-        new_solution.calculate_fitness_score(data.scores)
-
-        return new_solution 
\ No newline at end of file
+        return Tweaks._commit(Tweaks.propose_insert_library(solution, data), solution, data)
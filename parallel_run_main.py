@@ -1,9 +1,14 @@
+import argparse
 import glob
 import os
+import shutil
+import tempfile
 from concurrent.futures import ProcessPoolExecutor
 
 from models import Parser
 from models import Solver
+from models.instance_cache import InstanceCache
+from models.reducer import InstanceReducer
 
 INPUT_INSTANCES_DIR = 'input'
 OUTPUT_INSTANCES_DIR = 'output'
@@ -13,18 +18,43 @@ MAX_ITERATIONS = 1000
 NUM_CORES = 40
 
 
-def run_solver(version: str, instance_path: str) -> None:
+def publish_instance(instance_path: str, shared_dir: str):
+    """
+    Parse and reduce an instance once and return the path of the binary
+    image of the reduced instance with its IdMap (None if nothing was
+    removed). Workers memory-map the image read-only, so all jobs on the
+    same instance share one copy of the arrays in the page cache.
+    """
+    parser = Parser(instance_path)
+    data = parser.parse()
+    reduced = InstanceReducer.reduce(data)
+    if reduced is data and parser.cache_path is not None:
+        return parser.cache_path, None
+
+    # The image does not carry the IdMap, so it is passed along with the path
+    image_path = os.path.join(shared_dir, os.path.basename(InstanceCache.cache_path(instance_path)))
+    InstanceCache.save(reduced, image_path, InstanceCache.content_hash(instance_path))
+    return image_path, reduced.id_map
+
+
+def run_solver(version: str, instance_path: str, image_path: str = None, id_map=None,
+               mode: str = 'ils', workers: int = None) -> None:
     output_sub_dir = os.path.join(OUTPUT_INSTANCES_DIR, version)
     os.makedirs(output_sub_dir, exist_ok=True)
 
     solver = Solver()
-    parser = Parser(instance_path)
-    data = parser.parse()
+    data = InstanceCache.load(image_path) if image_path else None
+    if data is None:
+        data = InstanceReducer.reduce(Parser(instance_path).parse())
+    else:
+        data.id_map = id_map
 
-    result = solver.iterated_local_search(
+    result = solver.solve(
         data,
+        mode=mode,
         time_limit=MINUTES_TO_RUN * 60,
-        max_iterations=MAX_ITERATIONS
+        max_iterations=MAX_ITERATIONS,
+        num_workers=workers
     )
     score = result.fitness_score
     instance_name = os.path.basename(instance_path)
@@ -34,21 +64,42 @@ def run_solver(version: str, instance_path: str) -> None:
     result.export(output_file)
 
 
-def main():
+def main(mode: str = 'ils', workers: int = 1):
     instance_paths = glob.glob(f'{INPUT_INSTANCES_DIR}/*.txt')
-    jobs = []
+    shared_dir = tempfile.mkdtemp(dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
 
-    for v in range(1, 6):
-        version = f'v{v}'
-        for path in instance_paths:
-            jobs.append((version, path))
+    # Every job of a parallel mode runs `workers` processes of its own
+    max_workers = max(1, NUM_CORES // workers) if mode != 'ils' else NUM_CORES
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # Parse and reduce every instance exactly once, then fan out v1-v5 on its image
+            images = dict(zip(
+                instance_paths,
+                executor.map(publish_instance, instance_paths, [shared_dir] * len(instance_paths))
+            ))
 
-    with ProcessPoolExecutor(max_workers=NUM_CORES) as executor:
-        futures = [executor.submit(run_solver, version, path) for version, path in jobs]
+            jobs = []
+            for v in range(1, 6):
+                version = f'v{v}'
+                for path in instance_paths:
+                    jobs.append((version, path))
 
-        for future in futures:
-            future.result()  
+            futures = [
+                executor.submit(run_solver, version, path, *images[path], mode, workers)
+                for version, path in jobs
+            ]
+
+            for future in futures:
+                future.result()
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-m', '--mode', choices=Solver.MODES, default='ils')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='processes of each job in the parallel modes')
+
+    args = parser.parse_args()
+    main(args.mode, args.workers)
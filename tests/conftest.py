@@ -0,0 +1,82 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Parser  # noqa: E402
+
+
+def write_instance(path, scores, libraries, num_days):
+    """
+    Write an instance in the input format.
+
+    Args:
+        path: File to write
+        scores: Score of every book
+        libraries: (signup_days, books_per_day, book_ids) of every library
+        num_days: Number of days for scanning
+    """
+    with open(path, 'w') as file:
+        file.write(f"{len(scores)} {len(libraries)} {num_days}\n")
+        file.write(" ".join(map(str, scores)) + "\n")
+        for signup_days, books_per_day, book_ids in libraries:
+            file.write(f"{len(book_ids)} {signup_days} {books_per_day}\n")
+            file.write(" ".join(map(str, book_ids)) + "\n")
+
+
+def random_libraries(rng, num_books, num_libs, max_signup=6, max_books_per_day=3, max_books=12):
+    """Random (signup_days, books_per_day, book_ids) tuples over books [0, num_books)."""
+    return [
+        (rng.randint(1, max_signup), rng.randint(1, max_books_per_day),
+         rng.sample(range(num_books), rng.randint(1, min(max_books, num_books))))
+        for _ in range(num_libs)
+    ]
+
+
+def score_export(path, data):
+    """
+    Score an exported solution against `data`, asserting that it is
+    feasible: libraries sign up once and in time, and every library ships
+    only its own books within its scanning capacity.
+    """
+    with open(path) as file:
+        lines = file.read().split('\n')
+    curr_time = 0
+    signed = set()
+    scanned = set()
+    for i in range(int(lines[0])):
+        lib_id, count = map(int, lines[1 + 2 * i].split())
+        books = list(map(int, lines[2 + 2 * i].split()))
+        assert lib_id not in signed and len(books) == count
+        signed.add(lib_id)
+        if not books:
+            continue
+        curr_time += data.lib_signup_days[lib_id]
+        assert curr_time < data.num_days
+        assert len(books) <= (data.num_days - curr_time) * data.lib_books_per_day[lib_id]
+        assert set(books) <= set(data.libs[lib_id].book_ids)
+        scanned.update(books)
+    return sum(data.scores[book_id] for book_id in scanned)
+
+
+@pytest.fixture
+def make_instance(tmp_path):
+    """Factory that writes an instance to a temporary file and parses it."""
+    def make(scores, libraries, num_days, name='instance.txt'):
+        path = tmp_path / name
+        write_instance(path, scores, libraries, num_days)
+        return Parser(str(path), use_cache=False).parse()
+    return make
+
+
+@pytest.fixture
+def random_instance(make_instance):
+    """Factory for small random instances whose libraries share many books."""
+    def make(seed, num_books=40, num_libs=12, num_days=25, **library_options):
+        rng = random.Random(seed)
+        scores = [rng.randint(0, 9) for _ in range(num_books)]
+        return make_instance(scores, random_libraries(rng, num_books, num_libs, **library_options), num_days)
+    return make
@@ -0,0 +1,18 @@
+import multiprocessing
+import random
+import time
+
+from models.deadline import Deadline
+from models.initial_solution import InitialSolution
+
+
+def test_parallel_portfolio_stops_its_workers(random_instance):
+    random.seed(0)
+    data = random_instance(0, num_books=300, num_libs=60, num_days=80)
+    start = time.time()
+    solution = InitialSolution.generate_initial_solution_parallel(data, deadline=Deadline(1.0), num_workers=2)
+
+    assert time.time() - start < 1.0 + InitialSolution.GRACE_SECONDS + 1.0
+    assert not multiprocessing.active_children()
+    assert solution.fitness_score > 0
+    assert set(solution.signed_libraries) | set(solution.unsigned_libraries) == set(range(data.num_libs))
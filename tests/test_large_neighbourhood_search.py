@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from conftest import score_export
+from models.large_neighbourhood_search import LargeNeighbourhoodSearch
+from models.rebuild_engine import RebuildEngine
+from models.solution import Solution
+from models.solver import Solver
+
+SEEDS = range(20)
+ITERATIONS = 30
+
+
+def rebuilt_fitness(order, data):
+    """Fitness of `order` rebuilt from scratch by the RebuildEngine."""
+    return RebuildEngine.rebuild(Solution(list(order), [], {}, set()), data).fitness_score
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('solver_rule', [False, True])
+def test_destroy_repair_matches_full_rebuild(random_instance, seed, solver_rule):
+    """Destroyed and repaired solutions score what a full rebuild of their order scores."""
+    rng = random.Random(seed)
+    random.seed(seed)
+    data = random_instance(seed, num_books=rng.randint(10, 60), num_libs=rng.randint(4, 20),
+                           num_days=rng.randint(5, 30), max_signup=rng.randint(1, 8))
+    order = list(range(data.num_libs))
+    rng.shuffle(order)
+    signed = order[:rng.randint(1, len(order))]
+    current = Solution(signed, order[len(signed):], {}, set())
+    if solver_rule:
+        current = Solver()._rebuild_solution(current, data)
+    else:
+        current = RebuildEngine.rebuild(current, data)
+
+    lns = LargeNeighbourhoodSearch()
+    for _ in range(ITERATIONS):
+        if not current.signed_libraries:
+            break
+        name = rng.choice(sorted(lns.destroyers))
+        size = rng.randint(1, len(current.signed_libraries))
+        positions = lns.destroyers[name](current, data, size)
+        destroyed, removed, slots = lns.destroy(current, data, positions)
+        assert destroyed.fitness_score == rebuilt_fitness(destroyed.signed_libraries, data), name
+
+        candidate = lns.repair(destroyed, data, removed, slots)
+        assert candidate.fitness_score == rebuilt_fitness(candidate.signed_libraries, data), name
+        assert candidate.fitness_score >= destroyed.fitness_score
+        if candidate.fitness_score >= current.fitness_score or rng.random() < 0.3:
+            current = candidate
+
+
+def test_lns_mode_exports_claimed_fitness(random_instance, tmp_path):
+    random.seed(0)
+    data = random_instance(0, num_books=200, num_libs=40, num_days=60)
+    solver = Solver()
+    solution = solver.solve(data, mode='lns', time_limit=2)
+
+    assert solver.run_summary['lns']['iterations'] > 0
+    path = tmp_path / 'solution.txt'
+    solution.export(str(path))
+    assert score_export(path, data) == solution.fitness_score
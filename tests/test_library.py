@@ -0,0 +1,13 @@
+from models.library import BookView, Library
+
+
+def test_books_view_follows_book_ids():
+    scores = [5, 1, 9, 3]
+    library = Library(4, 2, 1, [0, 1, 2, 3], scores)
+    books = library.books
+
+    assert isinstance(books, BookView)
+    assert [(book.id, book.score) for book in books] == [(2, 9), (0, 5), (3, 3), (1, 1)]
+    assert len(books) == 4 and books[-1].id == 1
+    assert [book.id for book in books[1:3]] == [0, 3]
+    assert repr(library) == 'Library(%d, 4, 2, 1, [Book(2, 9), Book(0, 5), Book(3, 3), Book(1, 1)])' % library.id
@@ -0,0 +1,168 @@
+import random
+
+import pytest
+
+from models.move_bound import MoveBound
+from models.moves import BookChainMove, CrossoverMove, InsertMove, RebuildMove, ReplaceMove, SwapMove
+from models.rebuild_engine import RebuildEngine
+from models.solution import Solution
+from models.solver import Solver
+from models.tweaks import Tweaks
+
+SEEDS = range(40)
+STEPS = 40
+
+
+def greedy_fitness(order, data, margin=RebuildEngine.TWEAK_MARGIN):
+    """Fitness of `order` under the greedy rule, simulated from day 0 without the engine."""
+    scanned = set()
+    curr_time = 0
+    fitness = 0
+    for lib_id in order:
+        signup_end = curr_time + data.lib_signup_days[lib_id]
+        if signup_end >= data.num_days - margin:
+            continue
+        capacity = (data.num_days - signup_end) * data.lib_books_per_day[lib_id]
+        books = [book_id for book_id in data.libs[lib_id].book_ids if book_id not in scanned][:capacity]
+        if books:
+            scanned.update(books)
+            fitness += sum(data.scores[book_id] for book_id in books)
+            curr_time = signup_end
+    return fitness
+
+
+def check_solution(solution, data):
+    """
+    Check that the books of a solution are feasible for its order and that
+    its fitness and checkpoints agree with them. Returns the fitness.
+    """
+    per_lib = solution.scanned_books_per_library
+    assert {lib_id for lib_id, books in per_lib.items() if books} <= set(solution.signed_libraries)
+    scanned = set()
+    curr_time = 0
+    fitness = 0
+    for pos, lib_id in enumerate(solution.signed_libraries):
+        books = per_lib.get(lib_id)
+        if books:
+            curr_time += data.lib_signup_days[lib_id]
+            assert curr_time < data.num_days
+            assert len(books) <= (data.num_days - curr_time) * data.lib_books_per_day[lib_id]
+            assert set(books) <= set(data.libs[lib_id].book_ids)
+            assert scanned.isdisjoint(books)
+            scanned.update(books)
+            fitness += sum(data.scores[book_id] for book_id in books)
+        assert solution.checkpoint_times[pos + 1] == curr_time
+        assert solution.checkpoint_scores[pos + 1] == fitness
+    assert set(solution.scanned_books) == scanned
+    assert solution.fitness_score == fitness
+    if solution.reassigned_from is None:
+        assert fitness == greedy_fitness(solution.signed_libraries, data, solution.checkpoint_rule[0])
+    return fitness
+
+
+def order_after(move, solution):
+    after = solution.clone()
+    move.apply(after)
+    return after.signed_libraries
+
+
+def random_moves(solution, data, rng):
+    """One move of every type that applies to `solution`."""
+    signed = len(solution.signed_libraries)
+    unsigned = len(solution.unsigned_libraries)
+    moves = [RebuildMove(rng.randint(0, signed))]
+    if signed >= 2:
+        moves += [SwapMove(*rng.sample(range(signed), 2)), CrossoverMove(rng.randint(1, signed - 1))]
+    if signed and unsigned:
+        moves.append(ReplaceMove(rng.randrange(signed), rng.randrange(unsigned)))
+    if unsigned:
+        moves.append(InsertMove(rng.randrange(unsigned), rng.randint(0, signed)))
+    for propose in (Tweaks.propose_swap_last_book, Tweaks.propose_book_chain,
+                    Tweaks.propose_best_insert_library, Tweaks.propose_best_swap_signed_with_unsigned):
+        move = propose(solution, data)
+        if move is not None:
+            moves.append(move)
+    return moves
+
+
+def initial_solution(data, rng, solver_rule):
+    order = list(range(data.num_libs))
+    rng.shuffle(order)
+    signed = order[:rng.randint(1, len(order))]
+    solution = Solution(signed, order[len(signed):], {}, set())
+    if solver_rule:
+        return Solver()._rebuild_solution(solution, data)
+    return RebuildEngine.rebuild(solution, data)
+
+
+def random_walk(data, rng, solver_rule):
+    """
+    Walk over committed moves and solver perturbations; yields every move
+    tried as (solution, move, evaluated fitness, committed solution).
+    """
+    solver = Solver()
+    solution = initial_solution(data, rng, solver_rule)
+    check_solution(solution, data)
+
+    for _ in range(STEPS):
+        committed = []
+        for move in random_moves(solution, data, rng):
+            fitness = move.evaluate(solution, data)
+            new_solution = move.commit(solution, data)
+            yield solution, move, fitness, new_solution
+            committed.append(new_solution)
+
+        if rng.random() < 0.25:
+            strategy = rng.choice(['remove_insert', 'reorder', 'shuffle'])
+            solution = solver.perturb_solution(solution, data, strategy=strategy,
+                                               stagnation_level=rng.random(),
+                                               is_small_instance=rng.random() < 0.5)
+            check_solution(solution, data)
+        else:
+            solution = rng.choice(committed)
+
+
+def walk_instance(random_instance, seed):
+    rng = random.Random(seed)
+    random.seed(seed)
+    # Shapes range from roomy to so tight that few libraries fit
+    data = random_instance(seed, num_books=rng.randint(5, 60), num_libs=rng.randint(2, 20),
+                           num_days=rng.randint(3, 30), max_signup=rng.randint(1, 8))
+    return data, rng
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('solver_rule', [False, True])
+def test_moves_match_full_rebuild(random_instance, seed, solver_rule):
+    """
+    Every move scores the same in place, when committed and when its order
+    is rebuilt from scratch.
+    """
+    data, rng = walk_instance(random_instance, seed)
+    for solution, move, fitness, new_solution in random_walk(data, rng, solver_rule):
+        assert new_solution.fitness_score == fitness, type(move).__name__
+        assert check_solution(new_solution, data) == fitness
+        if solution.reassigned_from is None and not isinstance(move, BookChainMove):
+            assert greedy_fitness(order_after(move, solution), data) == fitness, type(move).__name__
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('solver_rule', [False, True])
+def test_move_bound_is_never_below_fitness(random_instance, seed, solver_rule):
+    """MoveBound never scores a move below its real fitness, so it never prunes an improvement."""
+    data, rng = walk_instance(random_instance, seed)
+    bound = MoveBound.of(data)
+    for solution, move, fitness, _ in random_walk(data, rng, solver_rule):
+        upper = move.upper_bound(solution, data)
+        assert upper is None or upper >= fitness, type(move).__name__
+        if fitness > solution.fitness_score:
+            assert not bound.prunes(move, solution, data)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_suffix_bound_covers_any_order(random_instance, seed):
+    data, rng = walk_instance(random_instance, seed)
+    bound = MoveBound.of(data)
+    for _ in range(50):
+        order = rng.sample(range(data.num_libs), rng.randint(1, data.num_libs))
+        assert bound.suffix_bound(order, 0, 0, 0) >= greedy_fitness(order, data)
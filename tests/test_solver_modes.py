@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from conftest import random_libraries, score_export
+from models.rebuild_engine import RebuildEngine
+from models.reducer import InstanceReducer
+from models.solution import Solution
+from models.solver import Solver
+
+
+def check_export(solution, data, tmp_path):
+    """Export `solution` and check that the file re-scores to its fitness."""
+    path = tmp_path / 'solution.txt'
+    solution.export(str(path))
+    assert score_export(path, data) == solution.fitness_score
+
+
+def rebuilt_fitness(solution, data):
+    """Fitness of the signed order of `solution` rebuilt from scratch."""
+    order = list(solution.signed_libraries)
+    unsigned = [lib_id for lib_id in range(data.num_libs) if lib_id not in set(order)]
+    return RebuildEngine.rebuild(Solution(order, unsigned, {}, set()), data).fitness_score
+
+
+def test_parallel_walkers_match_full_rebuild(random_instance, tmp_path):
+    random.seed(0)
+    data = random_instance(0, num_books=200, num_libs=40, num_days=60)
+    solver = Solver()
+    solution = solver.solve(data, mode='parallel', time_limit=3, num_workers=2)
+
+    assert solver.run_summary['walkers'] == 2 and solver.run_summary['iterations'] > 0
+    check_export(solution, data, tmp_path)
+    # Re-assigning the books of the final order can only add to its greedy fitness
+    assert solution.fitness_score >= rebuilt_fitness(solution, data) > 0
+
+
+def test_components_merge_to_claimed_fitness(make_instance, tmp_path):
+    rng = random.Random(0)
+    random.seed(0)
+    scores = [rng.randint(1, 9) for _ in range(60)]
+    # Two blocks of libraries over books [0, 30) and [30, 60), each tied
+    # together by its first book
+    libraries = []
+    for first in (0, 30):
+        for signup_days, books_per_day, book_ids in random_libraries(rng, 30, 8):
+            book_ids = sorted({first} | {first + book_id for book_id in book_ids})
+            libraries.append((signup_days, books_per_day, book_ids))
+    data = make_instance(scores, libraries, num_days=30)
+    assert len(data.library_components()) == 2
+
+    solver = Solver()
+    merged = solver._merge_orders(data, data.library_components())
+    check_export(merged, data, tmp_path)
+
+    solution = solver.component_search(data, time_limit=3, num_workers=1, min_component_size=2)
+
+    assert solver.run_summary['components'] == 2
+    check_export(solution, data, tmp_path)
+    assert solution.fitness_score >= solver.run_summary['merged_fitness'] > 0
+
+
+def test_components_of_empty_instance(make_instance, tmp_path):
+    # The reducer drops every library that cannot sign up in time
+    data = InstanceReducer.reduce(make_instance([1, 2, 3], [(10, 1, [0, 1]), (12, 2, [2])], num_days=5))
+    assert data.num_libs == 0
+
+    solution = Solver().solve(data, mode='components', time_limit=1)
+
+    assert solution.signed_libraries == [] and solution.fitness_score == 0
+    check_export(solution, data, tmp_path)
+
+
+def test_unknown_mode_is_rejected(random_instance):
+    with pytest.raises(ValueError):
+        Solver().solve(random_instance(0), mode='annealing', time_limit=1)